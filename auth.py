@@ -4,5 +4,5 @@ class UnauthorizedError(Exception):
 
 def check_authorization(headers) -> None:
     auth = headers.get("authorization")
-    if not auth or not auth.lower().startswith("bearer "):
+    if not auth or auth[:7].lower() != "bearer ":
         raise UnauthorizedError("Authorization header missing or invalid")
@@ -4,7 +4,14 @@ config.py — Application Configuration (Environment Variables)
 
 Uses pydantic-settings to load environment variables from a `.env` file
 and expose them as typed Python attributes. This centralises all config
-in one place so the rest of the app just imports `settings`.
+in one place so the rest of the app just calls `get_settings()`.
+
+Settings are built once per process and cached (`functools.lru_cache`).
+Consumers read them at import time (`settings = get_settings()` at module
+level, plus values derived from them such as the CORS origins in
+middleware/auth.py), so environment variables must be set before the app
+is imported — changing them afterwards has no effect. The instance is
+frozen because the same object is shared by every module.
 
 Environment variables loaded:
     SUPABASE_URL      → Supabase project URL (e.g. https://xxx.supabase.co)
@@ -17,6 +24,7 @@ Environment variables loaded:
     DEBUG             → Debug flag (not used yet, reserved for future logging levels)
 """
 
+from functools import lru_cache
 from pydantic_settings import BaseSettings
 
 
@@ -62,12 +70,24 @@ class Settings(BaseSettings):
     # ── Pydantic-settings config ────────────────────────────────────────────
     # Tells pydantic-settings to look for a `.env` file in the current
     # working directory (the backend/ folder when running uvicorn).
+    # frozen=True makes the shared cached instance immutable.
     model_config = {
         "env_file": ".env",
         "env_file_encoding": "utf-8",
+        "frozen": True,
     }
 
 
-# Singleton instance — import this everywhere:
-#   from app.core.config import settings
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """
+    Return the process-wide Settings instance, building it on first call.
+
+    Usage:
+        from app.core.config import get_settings
+        settings = get_settings()
+
+    Returns:
+        Settings: The cached (frozen) settings object.
+    """
+    return Settings()
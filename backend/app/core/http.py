@@ -0,0 +1,166 @@
+"""
+http.py — Shared Outbound HTTP Connection Pools
+================================================
+
+Every outbound HTTP client the backend uses lives here, one per worker:
+
+    Supabase client   → GoTrue (signup/login, token checks), the JWKS and
+                        PostgREST (messages). base_url + anon `apikey` preset;
+                        callers add the user's Authorization per request.
+    Shared pool       → OpenAI (ChatOpenAI) and the Google Trends MCP server.
+
+Both keep connections alive, so warm requests skip the TCP + TLS handshake.
+
+Shared pool:
+    One pooled httpx transport for calls to OpenAI and the MCP server.
+    HTTP/2 is enabled, so concurrent LLM calls to OpenAI are multiplexed
+    over one connection (plain http:// servers such as the MCP container
+    keep using HTTP/1.1).
+
+MCP sessions:
+    langchain-mcp-adapters opens a fresh httpx client per MCP session and
+    closes it when the session ends. mcp_httpx_client_factory() hands it a
+    client whose transport is a non-closing view of the shared pool, so
+    closing that client releases nothing but the wrapper.
+
+Lifecycle:
+    Clients are created lazily on first use and all closed by
+    close_http_clients() from main.py's lifespan on shutdown.
+
+Functions:
+    get_supabase_client()      → The shared Supabase httpx.AsyncClient
+    get_http_client()          → The shared httpx.AsyncClient (e.g. for ChatOpenAI)
+    mcp_httpx_client_factory() → httpx client factory for MCP connections
+    close_http_clients()       → Close every pool on shutdown
+"""
+
+from app.core.config import get_settings
+import httpx
+
+settings = get_settings()
+
+# ── Supabase client ─────────────────────────────────────────────────────────
+# Supabase answers quickly or not at all, so it gets a short timeout of its
+# own instead of the LLM-sized one below.
+SUPABASE_LIMITS = httpx.Limits(
+    max_connections=100,
+    max_keepalive_connections=50,
+    keepalive_expiry=30,
+)
+SUPABASE_TIMEOUT = 5.0
+
+_supabase_client: httpx.AsyncClient | None = None
+
+
+def get_supabase_client() -> httpx.AsyncClient:
+    """
+    Return the shared Supabase httpx client, creating it on first use.
+
+    Used by the auth middleware (JWKS, /auth/v1/user), routers/auth.py
+    (signup/login) and services/db (PostgREST), so every Supabase call
+    shares one connection pool.
+
+    Returns:
+        httpx.AsyncClient: Pointed at SUPABASE_URL with the anon key set as
+        the default `apikey` header, so callers only pass relative paths.
+    """
+    global _supabase_client
+    if _supabase_client is None or _supabase_client.is_closed:
+        _supabase_client = httpx.AsyncClient(
+            base_url=settings.SUPABASE_URL,
+            headers={"apikey": settings.SUPABASE_KEY},
+            timeout=SUPABASE_TIMEOUT,
+            limits=SUPABASE_LIMITS,
+        )
+    return _supabase_client
+
+
+# ── Shared pool (OpenAI + MCP) ──────────────────────────────────────────────
+HTTP_LIMITS = httpx.Limits(
+    max_connections=200,
+    max_keepalive_connections=100,
+    keepalive_expiry=30,
+)
+# Matches the OpenAI SDK's defaults: LLM streams can legitimately run long
+HTTP_TIMEOUT = httpx.Timeout(600.0, connect=5.0)
+
+_transport: httpx.AsyncHTTPTransport | None = None
+_client: httpx.AsyncClient | None = None
+
+
+class _SharedTransport(httpx.AsyncBaseTransport):
+    """Forward requests to the shared pool; closing it leaves the pool open."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport) -> None:
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        pass
+
+
+def _get_transport() -> httpx.AsyncHTTPTransport:
+    """Return the shared connection pool, creating it on first use."""
+    global _transport
+    if _transport is None:
+        _transport = httpx.AsyncHTTPTransport(http2=True, limits=HTTP_LIMITS)
+    return _transport
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Return the shared outbound httpx client, creating it on first use.
+
+    Returns:
+        httpx.AsyncClient: No base_url or default headers — callers such as
+        the OpenAI SDK set their own per request.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            transport=_SharedTransport(_get_transport()),
+            timeout=HTTP_TIMEOUT,
+        )
+    return _client
+
+
+def mcp_httpx_client_factory(
+    headers: dict[str, str] | None = None,
+    timeout: httpx.Timeout | None = None,
+    auth: httpx.Auth | None = None,
+) -> httpx.AsyncClient:
+    """
+    Build an httpx client for one MCP session, backed by the shared pool.
+
+    Same signature and defaults as mcp's create_mcp_http_client(), so it can
+    be set as `httpx_client_factory` in the MCP connection config.
+
+    Args:
+        headers: Default headers for the session (e.g. Authorization).
+        timeout: Request timeout; 30 s if not given, like the MCP SDK.
+        auth:    Optional httpx auth handler.
+
+    Returns:
+        httpx.AsyncClient: Safe for the MCP SDK to close when the session ends.
+    """
+    return httpx.AsyncClient(
+        transport=_SharedTransport(_get_transport()),
+        headers=headers,
+        timeout=timeout or httpx.Timeout(30.0),
+        auth=auth,
+        follow_redirects=True,
+    )
+
+
+async def close_http_clients() -> None:
+    """Close the Supabase client and the shared pool, releasing their connections."""
+    global _supabase_client, _transport, _client
+    if _supabase_client is not None:
+        await _supabase_client.aclose()
+    _supabase_client = None
+    if _transport is not None:
+        await _transport.aclose()
+    _transport = None
+    _client = None
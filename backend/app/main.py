@@ -7,20 +7,56 @@ This is the root of the backend application. It:
 2. Adds CORS middleware so the React frontend can make cross-origin requests.
 3. Adds custom AuthMiddleware to protect all routes except public ones.
 4. Registers all API routers (health, auth, chat).
+5. Opens/closes per-worker resources (Supabase client, JWKS, outbound HTTP pool) via `lifespan`.
 
 Middleware execution order (per request):
     Request → CORS check → AuthMiddleware (JWT validation) → Router handler → Response
+
+Running:
+    Run under uvloop (libuv-based event loop) and httptools (C HTTP parser)
+    rather than uvicorn's pure-Python defaults — every request here is I/O
+    bound (Supabase, OpenAI, MCP, SSE), so the event loop is the hot path:
+        uvicorn app.main:app --host 0.0.0.0 --port 8000 --loop uvloop --http httptools
+    The Dockerfile does this; the explicit flags are for that Linux image,
+    where both packages are installed. requirements.txt skips uvloop on
+    Windows, and `--loop uvloop` then fails with an ImportError — for local
+    runs use the default `--loop auto`, which picks uvloop/httptools when
+    installed and falls back to asyncio/h11 otherwise:
+        uvicorn app.main:app --host 0.0.0.0 --port 8000 --reload
 """
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.core.config import settings
+from app.core.config import get_settings
+from app.core.http import close_http_clients
+from app.middleware import auth as auth_middleware
 from app.middleware.auth import AuthMiddleware
 from app.routers import health, auth, chat
 
+settings = get_settings()
+
+
+# ── Startup / Shutdown ──────────────────────────────────────────────────────
+# Once per worker: fetch the JWKS and start its periodic refresh. On
+# shutdown the refresh task is stopped and every outbound connection pool
+# (Supabase, OpenAI/MCP — see app/core/http.py) is closed in one place, so
+# a --reload doesn't leak sockets or tasks.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await auth_middleware.startup()
+    try:
+        yield
+    finally:
+        await auth_middleware.shutdown()
+        await close_http_clients()
+
+
 # ── Create FastAPI Application ──────────────────────────────────────────────
 # The app title appears in the auto-generated OpenAPI docs at /docs
-app = FastAPI(title=settings.APP_NAME)
+app = FastAPI(title=settings.APP_NAME, lifespan=lifespan)
+
 
 # ── CORS Middleware ─────────────────────────────────────────────────────────
 # Cross-Origin Resource Sharing: allows the React frontend (running on a
@@ -7,15 +7,40 @@ It validates the Supabase JWT token and attaches user information to the
 request so downstream handlers can use it.
 
 Flow:
-    1. Check if the path is public (login, signup, health, docs) → skip auth.
-    2. Check if it's a CORS preflight (OPTIONS) → skip auth.
+    1. Check if it's a CORS preflight (OPTIONS) → answer it directly (204).
+    2. Check if the path is public (login, signup, health, docs) → skip auth.
     3. Extract the Bearer token from the Authorization header.
-    4. Call Supabase's /auth/v1/user endpoint to verify the token is valid.
+    4. Look the token up in the verified-token cache; on a miss, verify the
+       JWT signature locally against Supabase's JWKS (falling back to the
+       /auth/v1/user endpoint if no matching signing key is available).
     5. If valid → attach user_id, user_email, access_token to request.state.
     6. If invalid → return 401 Unauthorized immediately (request never reaches router).
 
 This is the security gate — no unauthenticated request can reach /chat/* endpoints.
 
+Note on caching:
+    Verified tokens are cached until their own `exp` claim, keyed by a
+    SHA-256 fingerprint of the token (never the raw JWT). In steady state
+    almost every request is a cache hit, so verification is paid roughly
+    once per token instead of on every request. Concurrent misses for the
+    same token are collapsed into one verification (single-flight). Rejected
+    tokens are remembered for 10 seconds so retry loops stay in-process.
+
+Note on local verification:
+    Supabase projects using asymmetric signing keys publish them at
+    {SUPABASE_URL}/auth/v1/.well-known/jwks.json. We keep those keys in
+    memory (refreshed every 10 minutes, or immediately when a token names an
+    unknown `kid`) and check signature, expiry, audience and issuer with
+    python-jose — a CPU-only operation instead of a network round trip.
+    Projects still on the legacy shared HS256 secret have no public keys
+    to fetch, so their tokens fall through to the /auth/v1/user call.
+
+Note on connections:
+    All calls to Supabase (JWKS + /auth/v1/user) go through the shared
+    Supabase httpx.AsyncClient (core/http.py get_supabase_client()).
+    Reusing its keep-alive pool avoids a fresh DNS lookup + TLS handshake
+    on every verification.
+
 Note on CORS:
     When this middleware returns a 401 directly, the response bypasses the
     CORSMiddleware (which sits above it). So we must manually add CORS
@@ -23,134 +48,500 @@ Note on CORS:
     the frontend can't read the status code.
 """
 
-from fastapi import Request
-from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
-from app.core.config import settings
-import httpx
+from starlette.types import ASGIApp, Receive, Scope, Send
+from cachetools import TTLCache
+from jose import jwt, JWTError
+from app.core.config import get_settings
+from app.core.http import get_supabase_client
+from app.utils.cache import SieveCache
+from app.utils.tokens import token_cache_key
+import asyncio
+import json
+import logging
+import time
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
 
 
 # ── Public Paths ────────────────────────────────────────────────────────────
 # These routes do NOT require a JWT token. Everything else is protected.
-PUBLIC_PATHS = {"/health", "/auth/login", "/auth/signup", "/docs", "/openapi.json"}
+# Exact paths are a frozenset lookup; the docs UIs also load sub-resources
+# (e.g. /docs/oauth2-redirect), so they are matched by prefix instead.
+PUBLIC_EXACT = frozenset({"/health", "/auth/login", "/auth/signup", "/openapi.json"})
+PUBLIC_PREFIXES = ("/docs", "/redoc")
 
 # ── Allowed CORS origins (must match main.py CORS config) ──────────────────
 ALLOWED_ORIGINS = {settings.FRONTEND_URL, "http://localhost:5173", "http://localhost:3000"}
 
+# ── Precomputed CORS response headers (per allowed origin) ─────────────────
+# Origins are fixed at startup, so the ASGI header tuples are built once
+# here instead of on every 401 / preflight. Keyed by the origin as raw bytes
+# (how it arrives in the ASGI scope). Unknown origins get none.
+_CORS_HEADERS_BY_ORIGIN: dict[bytes, list[tuple[bytes, bytes]]] = {
+    o.encode(): [
+        (b"access-control-allow-origin", o.encode()),
+        (b"access-control-allow-credentials", b"true"),
+        (b"access-control-allow-headers", b"*"),
+        (b"access-control-allow-methods", b"*"),
+    ]
+    for o in ALLOWED_ORIGINS
+}
+_PREFLIGHT_HEADERS_BY_ORIGIN: dict[bytes, list[tuple[bytes, bytes]]] = {
+    o.encode(): [
+        (b"access-control-allow-origin", o.encode()),
+        (b"access-control-allow-credentials", b"true"),
+        (b"access-control-max-age", b"86400"),
+        (b"vary", b"Origin"),
+        (b"content-length", b"0"),
+    ]
+    for o in ALLOWED_ORIGINS
+}
+
+# ── Verified-token cache ───────────────────────────────────────────────────
+# token_cache_key(token) → (user_id, email), kept until the token's own `exp`
+# so we never trust a token past its lifetime nor re-verify it needlessly.
+# Size-bounded with SIEVE eviction, which keeps busy sessions' tokens cached
+# even when lots of short-lived (one-off) tokens pass through.
+#
+# Why not key by the `jti` claim? We'd have to read it from the token before
+# verifying it, so a forged token reusing a cached jti would be accepted —
+# and Supabase access tokens don't reliably carry a jti anyway.
+_token_cache = SieveCache(maxsize=10_000)
+
+# Used when a token verified via /auth/v1/user carries no `exp` claim.
+FALLBACK_TOKEN_TTL = 30  # seconds
 
-def _cors_response(status_code: int, content: dict, request: Request) -> JSONResponse:
+# token_cache_key(token) → True for tokens we recently rejected. Buggy
+# clients retrying an expired token in a loop (or crude stuffing bursts) are
+# answered from memory instead of re-verifying. Kept short so a user who
+# re-logs in is never locked out for long.
+_bad_token_cache: TTLCache = TTLCache(maxsize=10_000, ttl=10)
+
+# Single-flight: token key → Future for a verification already in progress.
+# A burst of requests with the same fresh token (SPA start-up) makes one
+# verification; the rest await its result instead of repeating the work.
+_inflight: dict[str, asyncio.Future] = {}
+
+# ── Supabase JWKS (public signing keys) ────────────────────────────────────
+# kid → JWK dict. Refreshed every JWKS_REFRESH_SECONDS, and on demand when a
+# token carries an unknown kid (key rotation) — but no more often than
+# JWKS_MIN_REFETCH_SECONDS, so garbage tokens can't hammer the endpoint.
+JWKS_REFRESH_SECONDS = 600
+JWKS_MIN_REFETCH_SECONDS = 30
+JWT_ALGORITHMS = ["RS256", "ES256"]
+JWT_AUDIENCE = "authenticated"
+
+_jwks: dict[str, dict] = {}
+_jwks_fetched_at = float("-inf")  # never fetched
+_jwks_lock = asyncio.Lock()
+_jwks_refresh_task: asyncio.Task | None = None
+
+async def _send_cors_error(send: Send, status_code: int, content: dict, origin: bytes) -> None:
     """
-    Create a JSONResponse with CORS headers so the browser doesn't block it.
+    Send a JSON error response with CORS headers so the browser doesn't block it.
 
-    When the auth middleware rejects a request (401), it returns a response
-    BEFORE the CORSMiddleware has a chance to add headers. Without CORS
-    headers, the browser blocks the response entirely and the frontend
-    sees a network error instead of a clean 401.
+    When the auth middleware rejects a request (401), it responds BEFORE
+    the CORSMiddleware has a chance to add headers. Without CORS headers,
+    the browser blocks the response entirely and the frontend sees a
+    network error instead of a clean 401.
 
     Args:
+        send:        The ASGI send callable for this request.
         status_code: HTTP status code (e.g. 401).
         content:     JSON body (e.g. {"detail": "..."}).
-        request:     The incoming request (used to read the Origin header).
+        origin:      The request's raw Origin header (b"" if absent).
+    """
+    body = json.dumps(content).encode()
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+        *_CORS_HEADERS_BY_ORIGIN.get(origin, ()),
+    ]
+    await send({"type": "http.response.start", "status": status_code, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _send_preflight(send: Send, origin: bytes, request_method: bytes, request_headers: bytes) -> None:
+    """
+    Answer a CORS preflight request with 204 No Content.
+
+    Mirrors what CORSMiddleware does for our config (all methods, all
+    headers, credentials allowed): the requested method and headers are
+    echoed back, since browsers don't treat "*" as a wildcard for
+    credentialed requests — and never for Authorization.
+
+    Args:
+        send:            The ASGI send callable for this request.
+        origin:          Raw Origin header (must be an allowed origin).
+        request_method:  Raw Access-Control-Request-Method header.
+        request_headers: Raw Access-Control-Request-Headers header (may be b"").
+    """
+    response_headers = [
+        *_PREFLIGHT_HEADERS_BY_ORIGIN[origin],
+        (b"access-control-allow-methods", request_method),
+    ]
+    if request_headers:
+        response_headers.append((b"access-control-allow-headers", request_headers))
+    await send({"type": "http.response.start", "status": 204, "headers": response_headers})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def _refresh_jwks(min_age: float) -> None:
+    """
+    Re-download Supabase's JWKS if the cached copy is older than `min_age`.
+
+    Failures are logged and swallowed — the previous keys (if any) stay in
+    place and callers fall back to the /auth/v1/user endpoint.
+
+    Args:
+        min_age: Skip the fetch if the keys were fetched less than this many
+                 seconds ago (another request may have just refreshed them).
+    """
+    global _jwks, _jwks_fetched_at
+
+    async with _jwks_lock:
+        if time.monotonic() - _jwks_fetched_at < min_age:
+            return
+        try:
+            client = get_supabase_client()
+            response = await client.get("/auth/v1/.well-known/jwks.json")
+            response.raise_for_status()
+            _jwks = {k["kid"]: k for k in response.json().get("keys", []) if "kid" in k}
+        except Exception:
+            logger.warning("Could not fetch Supabase JWKS — falling back to /auth/v1/user")
+        # Record the attempt even on failure so we don't retry on every request
+        _jwks_fetched_at = time.monotonic()
+
+
+async def _get_signing_key(kid: str) -> dict | None:
+    """
+    Return the JWK for `kid`, refreshing the key set when stale or missing.
+
+    Args:
+        kid: Key ID from the JWT header.
+
+    Returns:
+        The matching JWK dict, or None if Supabase doesn't publish it.
+    """
+    if time.monotonic() - _jwks_fetched_at >= JWKS_REFRESH_SECONDS:
+        await _refresh_jwks(JWKS_REFRESH_SECONDS)
+
+    key = _jwks.get(kid)
+    if key is None:
+        # Unknown kid — keys may have rotated since our last fetch
+        await _refresh_jwks(JWKS_MIN_REFETCH_SECONDS)
+        key = _jwks.get(kid)
+    return key
+
+
+async def _refresh_jwks_every(interval: float) -> None:
+    """
+    Background task: keep the JWKS fresh so requests never wait on the fetch.
+
+    Args:
+        interval: Seconds between refreshes (JWKS_REFRESH_SECONDS).
+    """
+    while True:
+        await asyncio.sleep(interval)
+        await _refresh_jwks(interval)
+
+
+# ── Lifecycle (called from main.py's lifespan) ─────────────────────────────
+async def startup() -> None:
+    """
+    Build per-worker auth resources: fetch the JWKS, start its refresh.
+
+    Fetching the keys here means the first authenticated request is already
+    CPU-only; the background task then refreshes them every
+    JWKS_REFRESH_SECONDS. _get_signing_key still refreshes on demand, so
+    a failed fetch here isn't fatal.
+    """
+    global _jwks_refresh_task
+    await _refresh_jwks(0)
+    if _jwks_refresh_task is None:
+        _jwks_refresh_task = asyncio.create_task(_refresh_jwks_every(JWKS_REFRESH_SECONDS))
+
+
+async def shutdown() -> None:
+    """Stop the JWKS refresh task."""
+    global _jwks_refresh_task
+    if _jwks_refresh_task is not None:
+        _jwks_refresh_task.cancel()
+        try:
+            await _jwks_refresh_task
+        except asyncio.CancelledError:
+            pass
+        _jwks_refresh_task = None
+
+
+async def _verify_locally(token: str) -> dict:
+    """
+    Verify a token's signature and claims against Supabase's public keys.
+
+    Args:
+        token: The raw JWT from the Authorization header.
+
+    Returns:
+        The verified claims (guaranteed to contain `sub` and `exp`).
+
+    Raises:
+        LookupError: No public key is available for this token (legacy HS256
+                     project, unknown kid, JWKS unreachable) — the caller
+                     should ask Supabase instead.
+        JWTError:    The token is malformed, expired, or fails validation.
+    """
+    header = jwt.get_unverified_header(token)
+    if header.get("alg") not in JWT_ALGORITHMS or not header.get("kid"):
+        raise LookupError("No public key for this token")
+
+    key = await _get_signing_key(header["kid"])
+    if key is None:
+        raise LookupError("No public key for this token")
+
+    return jwt.decode(
+        token,
+        key,
+        algorithms=JWT_ALGORITHMS,
+        audience=JWT_AUDIENCE,
+        issuer=f"{settings.SUPABASE_URL}/auth/v1",
+        options={"require_exp": True, "require_sub": True},
+    )
+
+
+async def _fetch_supabase_user(token: str) -> tuple[str, str] | None:
+    """
+    Verify a token against Supabase's /auth/v1/user endpoint.
+
+    Args:
+        token: The raw JWT from the Authorization header.
+
+    Returns:
+        (user_id, email) if Supabase accepts the token, None if it rejects it.
+
+    Raises:
+        Exception: On network errors or a malformed Supabase response.
+    """
+    client = get_supabase_client()
+    response = await client.get(
+        "/auth/v1/user",
+        headers={"Authorization": f"Bearer {token}"},
+    )
+
+    if response.status_code != 200:
+        return None
+
+    user_data = response.json()
+    return user_data["id"], user_data.get("email", "")
+
+
+async def _verify_uncached(token: str, key: str) -> tuple[str, str] | None:
+    """
+    Verify a token from scratch and record the outcome in the caches.
+
+    Tries local JWKS verification first; only when no public key applies do
+    we ask Supabase's /auth/v1/user endpoint.
+
+    Args:
+        token: The raw JWT from the Authorization header.
+        key:   token_cache_key(token).
+
+    Returns:
+        (user_id, email) if the token is valid, None if it is rejected.
+
+    Raises:
+        Exception: Propagated from _fetch_supabase_user on network errors.
+    """
+    try:
+        claims = await _verify_locally(token)
+        user = claims["sub"], claims.get("email", "")
+        expires_at = claims["exp"]
+    except JWTError:
+        # Bad signature, expired, wrong audience/issuer — no
+        # point asking Supabase, it would say the same thing
+        user = None
+    except LookupError:
+        user = await _fetch_supabase_user(token)
+        if user is not None:
+            # Supabase vouched for the token, so its (unverified)
+            # exp claim is trustworthy enough to bound the cache
+            expires_at = jwt.get_unverified_claims(token).get(
+                "exp", time.time() + FALLBACK_TOKEN_TTL
+            )
+
+    if user is not None:
+        _token_cache.set(key, user, expires_at)
+    else:
+        _bad_token_cache[key] = True
+    return user
+
+
+async def _verify_token(token: str) -> tuple[str, str] | None:
+    """
+    Verify a token, serving repeat lookups from the in-process caches.
+
+    Concurrent misses for the same token are collapsed (single-flight): the
+    first request verifies, the others await the same Future.
+
+    Args:
+        token: The raw JWT from the Authorization header.
 
     Returns:
-        JSONResponse with Access-Control-Allow-* headers if the origin is allowed.
+        (user_id, email) if the token is valid, None if it is rejected.
+        Valid tokens are cached until they expire, rejected ones for 10 s. Network
+        errors are not cached, so a Supabase blip can't lock out a valid token.
+
+    Raises:
+        Exception: Propagated from _fetch_supabase_user on network errors
+                   (to every request waiting on that verification).
     """
-    response = JSONResponse(status_code=status_code, content=content)
-    origin = request.headers.get("origin", "")
-    if origin in ALLOWED_ORIGINS:
-        response.headers["Access-Control-Allow-Origin"] = origin
-        response.headers["Access-Control-Allow-Credentials"] = "true"
-        response.headers["Access-Control-Allow-Headers"] = "*"
-        response.headers["Access-Control-Allow-Methods"] = "*"
-    return response
+    key = token_cache_key(token)
+    user = _token_cache.get(key)
+    if user is not None:
+        return user
+    if key in _bad_token_cache:
+        return None
+
+    # Join a verification that's already running for this token
+    while (pending := _inflight.get(key)) is not None:
+        try:
+            # shield(): if *this* request is cancelled, don't cancel the
+            # shared Future the other waiters depend on
+            return await asyncio.shield(pending)
+        except asyncio.CancelledError:
+            if not pending.cancelled():
+                raise  # we were cancelled ourselves
+            # The leading request was cancelled (client went away) — retry
 
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        user = await _verify_uncached(token, key)
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as exc:
+        future.set_exception(exc)
+        future.exception()  # mark retrieved — no "never retrieved" warning without waiters
+        raise
+    else:
+        future.set_result(user)
+    finally:
+        del _inflight[key]
+    return user
 
-class AuthMiddleware(BaseHTTPMiddleware):
+
+class AuthMiddleware:
     """
-    Starlette middleware that validates Supabase JWT tokens.
+    Pure ASGI middleware that validates Supabase JWT tokens.
 
     For every protected request, it:
     - Extracts the Bearer token from the Authorization header
-    - Verifies it against Supabase's auth API
+    - Verifies it against Supabase's public keys, or its auth API as a
+      fallback (cached per token until the token expires)
     - Attaches user info (user_id, user_email, access_token) to request.state
     - Returns 401 if the token is missing, invalid, or expired
 
+    Why not BaseHTTPMiddleware?
+        BaseHTTPMiddleware runs every request through an extra task group and
+        a memory stream between us and the app. Working on the raw ASGI scope
+        skips that (and never builds a Request object), and streaming
+        responses such as /chat/send pass straight through untouched.
+
     Usage in routers:
         user_id = request.state.user_id
         token   = request.state.access_token
     """
 
-    async def dispatch(self, request: Request, call_next):
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """
-        Process each incoming HTTP request.
+        Process each incoming ASGI connection.
 
         Args:
-            request:   The incoming HTTP request object.
-            call_next: Async callable to pass the request to the next middleware/route.
-
-        Returns:
-            Response from the next handler (if auth passes) or a 401 JSONResponse.
+            scope:   The ASGI connection scope (path, method, headers, state...).
+            receive: ASGI receive callable, passed through untouched.
+            send:    ASGI send callable, used directly for 401 responses.
         """
+        # Lifespan and websocket scopes aren't ours to authenticate
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-        # ── Step 1: Skip auth for public paths ─────────────────────────────
-        # Login, signup, health check, and docs don't need authentication.
-        if request.url.path in PUBLIC_PATHS:
-            return await call_next(request)
+        # One pass over the raw ASGI headers (lowercase byte-string pairs)
+        # instead of building Starlette Headers / Request wrappers.
+        origin = authorization = request_method = request_headers = b""
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                authorization = value
+            elif name == b"origin":
+                origin = value
+            elif name == b"access-control-request-method":
+                request_method = value
+            elif name == b"access-control-request-headers":
+                request_headers = value
 
-        # ── Step 2: Skip CORS preflight requests ───────────────────────────
+        # ── Step 1: Answer CORS preflight requests ─────────────────────────
         # Browsers send an OPTIONS request before the real request to check
-        # if CORS is allowed. These must pass through without auth.
-        if request.method == "OPTIONS":
-            return await call_next(request)
+        # if CORS is allowed. For allowed origins we answer it right here
+        # with a 204 (no routing, no auth); max-age lets the browser cache
+        # the answer for a day instead of re-asking before every fetch.
+        # Anything else falls through to CORSMiddleware, which rejects it.
+        if scope["method"] == "OPTIONS":
+            if request_method and origin in _PREFLIGHT_HEADERS_BY_ORIGIN:
+                await _send_preflight(send, origin, request_method, request_headers)
+            else:
+                await self.app(scope, receive, send)
+            return
+
+        # ── Step 2: Skip auth for public paths ─────────────────────────────
+        # Login, signup, health check, and docs don't need authentication.
+        path = scope["path"]
+        if path in PUBLIC_EXACT or path.startswith(PUBLIC_PREFIXES):
+            await self.app(scope, receive, send)
+            return
 
         # ── Step 3: Extract Bearer token ───────────────────────────────────
         # Expected header format: "Authorization: Bearer <jwt_token>"
-        auth_header = request.headers.get("Authorization")
-        if not auth_header or not auth_header.startswith("Bearer "):
-            return _cors_response(
+        # (the scheme name is case-insensitive). Compared as raw bytes with a
+        # slice; only the token itself is decoded (JWTs are plain ASCII, and
+        # latin-1 can't fail — junk bytes just make an invalid token).
+        token = authorization[7:].strip().decode("latin-1")
+        if authorization[:7].lower() != b"bearer " or not token:
+            await _send_cors_error(
+                send,
                 401,
                 {"detail": "Missing or invalid Authorization header"},
-                request,
+                origin,
             )
-
-        token = auth_header.split(" ", 1)[1]
+            return
 
         # ── Step 4: Verify token with Supabase ─────────────────────────────
-        # We call Supabase's /auth/v1/user endpoint with the JWT. If the
-        # token is valid, Supabase returns the user object. If expired or
-        # invalid, it returns a non-200 status.
+        # _verify_token() answers from the cache when it can; otherwise it
+        # checks the JWT signature against Supabase's JWKS, or calls the
+        # /auth/v1/user endpoint when no public key applies. Either way we get
+        # (user_id, email) back for a valid token and None for an
+        # expired/invalid one.
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{settings.SUPABASE_URL}/auth/v1/user",
-                    headers={
-                        "Authorization": f"Bearer {token}",
-                        "apikey": settings.SUPABASE_KEY,
-                    },
-                )
-
-            if response.status_code != 200:
-                return _cors_response(
-                    401,
-                    {"detail": "Invalid or expired token"},
-                    request,
-                )
-
-            # ── Step 5: Attach user info to request.state ──────────────────
-            # This makes user_id and access_token available in all route
-            # handlers via request.state.user_id, request.state.access_token
-            user_data = response.json()
-            request.state.user_id = user_data["id"]
-            request.state.user_email = user_data.get("email", "")
-            request.state.access_token = token
-
+            user = await _verify_token(token)
         except Exception:
             # Network error, Supabase down, malformed response, etc.
-            return _cors_response(
-                401,
-                {"detail": "Token verification failed"},
-                request,
-            )
+            await _send_cors_error(send, 401, {"detail": "Token verification failed"}, origin)
+            return
+
+        if user is None:
+            await _send_cors_error(send, 401, {"detail": "Invalid or expired token"}, origin)
+            return
+
+        # ── Step 5: Attach user info to request.state ──────────────────────
+        # Starlette's request.state is a view over scope["state"], so route
+        # handlers can keep using request.state.user_id / .access_token.
+        state = scope.setdefault("state", {})
+        state["user_id"], state["user_email"] = user
+        state["access_token"] = token
 
         # ── Step 6: Continue to the actual route handler ───────────────────
-        return await call_next(request)
+        await self.app(scope, receive, send)
@@ -4,16 +4,22 @@ auth.py — Authentication Router (Signup & Login)
 
 Handles user registration and login via Supabase Auth.
 
+We call Supabase's GoTrue REST endpoints directly with the shared async
+httpx client (core/http.py) instead of the supabase-py client:
+its auth methods are blocking, so calling them from an `async def` parks
+the event loop for the whole Supabase round trip.
+
 Endpoints:
     POST /auth/signup → Create a new user account, return JWT + user info
     POST /auth/login  → Authenticate existing user, return JWT + user info
 
 Both endpoints are PUBLIC (no JWT required) — they are listed in
-PUBLIC_PATHS in middleware/auth.py.
+PUBLIC_EXACT in middleware/auth.py.
 
 Flow:
     1. Frontend sends { email, password } as JSON.
-    2. Backend calls Supabase Auth API (sign_up or sign_in_with_password).
+    2. Backend calls Supabase Auth API (POST /auth/v1/signup or
+       POST /auth/v1/token?grant_type=password).
     3. Supabase returns a session object with access_token (JWT).
     4. Backend returns the token + user_id + email to the frontend.
     5. Frontend stores the token and sends it with every subsequent request.
@@ -21,28 +27,11 @@ Flow:
 
 from fastapi import APIRouter, HTTPException
 from app.schemas.auth import AuthRequest, AuthResponse
-from app.core.config import settings
-from supabase import create_client
+from app.core.http import get_supabase_client
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
-def _get_supabase():
-    """
-    Create a Supabase client for auth operations.
-
-    Returns:
-        supabase.Client: A fresh Supabase client instance using the
-        project URL and anon key from settings.
-
-    Note:
-        We create a new client per request to avoid shared state issues.
-        This client uses the anon key (not a user token) because the
-        user hasn't authenticated yet at this point.
-    """
-    return create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
-
-
 @router.post("/signup", response_model=AuthResponse)
 async def signup(req: AuthRequest):
     """
@@ -58,23 +47,27 @@ async def signup(req: AuthRequest):
         HTTPException 400: If signup fails (e.g. email already exists, weak password).
 
     Flow:
-        1. Call Supabase auth.sign_up() with email + password.
-        2. If email confirmation is enabled, user gets an email (we return a message).
+        1. POST email + password to Supabase's /auth/v1/signup endpoint.
+        2. If email confirmation is enabled, Supabase returns just the user
+           (no access_token) and the user gets an email (we return a message).
         3. If confirmation is disabled (dev mode), we get a session immediately.
         4. Return the JWT access_token so the frontend can start using it right away.
     """
     try:
-        client = _get_supabase()
-        result = client.auth.sign_up({
-            "email": req.email,
-            "password": req.password,
-        })
+        response = await get_supabase_client().post(
+            "/auth/v1/signup",
+            json={"email": req.email, "password": req.password},
+        )
+        if response.status_code >= 400:
+            raise HTTPException(status_code=400, detail="Signup failed. Please try again.")
 
-        if result.user is None:
+        data = response.json()
+        # With a session the user is nested; without one the body IS the user
+        user = data.get("user") if "access_token" in data else data
+        if not user or not user.get("id"):
             raise HTTPException(status_code=400, detail="Signup failed")
 
-        session = result.session
-        if session is None:
+        if "access_token" not in data:
             # Email confirmation is required — user must check their inbox
             raise HTTPException(
                 status_code=200,
@@ -82,8 +75,8 @@ async def signup(req: AuthRequest):
             )
 
         return AuthResponse(
-            access_token=session.access_token,
-            user_id=result.user.id,
+            access_token=data["access_token"],
+            user_id=user["id"],
             email=req.email,
         )
 
@@ -108,7 +101,7 @@ async def login(req: AuthRequest):
         HTTPException 401: If credentials are invalid (wrong email or password).
 
     Flow:
-        1. Call Supabase auth.sign_in_with_password() with email + password.
+        1. POST email + password to Supabase's /auth/v1/token?grant_type=password.
         2. Supabase verifies credentials and returns a session with JWT.
         3. Return the JWT so the frontend can store it and use it for API calls.
 
@@ -117,23 +110,27 @@ async def login(req: AuthRequest):
         ALL failure cases to avoid leaking whether an email exists or not.
     """
     try:
-        client = _get_supabase()
-        result = client.auth.sign_in_with_password({
-            "email": req.email,
-            "password": req.password,
-        })
+        response = await get_supabase_client().post(
+            "/auth/v1/token",
+            params={"grant_type": "password"},
+            json={"email": req.email, "password": req.password},
+        )
+        if response.status_code != 200:
+            raise HTTPException(status_code=401, detail="Invalid credentials")
 
-        if result.user is None or result.session is None:
+        data = response.json()
+        user = data.get("user") or {}
+        if not data.get("access_token") or not user.get("id"):
             raise HTTPException(status_code=401, detail="Invalid credentials")
 
         return AuthResponse(
-            access_token=result.session.access_token,
-            user_id=result.user.id,
+            access_token=data["access_token"],
+            user_id=user["id"],
             email=req.email,
         )
 
     except HTTPException:
         raise
-    except Exception as e:
+    except Exception:
         # Don't leak specific error details — always say "Invalid credentials"
         raise HTTPException(status_code=401, detail="Invalid credentials")
@@ -14,40 +14,80 @@ and attaches user_id + access_token to request.state before these handlers run.
 
 SSE (Server-Sent Events) Streaming:
     The /chat/send endpoint returns an EventSourceResponse that streams events:
-    - "token"       → A chunk of the AI's response text (arrives incrementally)
+    - "token"       → A chunk of the AI's response text (arrives incrementally;
+                      the agent coalesces several LLM tokens into one event)
     - "tool_start"  → The agent started using a tool (e.g. "tavily_search")
     - "tool_end"    → The agent finished using a tool
+    - "tool_progress" → A running tool's progress (e.g. 3 of 10 articles)
     - "tool_status" → Informational message (e.g. "MCP unavailable")
     - "done"        → Final event with the conversation_id
 
     The frontend reads these events to show:
     - Tokens appearing one by one (streaming effect)
-    - "Using tavily_search..." indicator
+    - "Using tavily_search..." indicator (with progress when reported)
     - The conversation_id for future reference
 """
 
-import json
+import asyncio
 import uuid
 import traceback
 import logging
+from functools import lru_cache
 from fastapi import APIRouter, Request
 
 logger = logging.getLogger(__name__)
 
 from sse_starlette.sse import EventSourceResponse
 from app.schemas.chat import ChatRequest, MessageOut, ConversationOut
+from app.schemas.events import (
+    DoneEvent,
+    TokenEvent,
+    ToolEvent,
+    ToolProgressEvent,
+    ToolStatusEvent,
+    sse_frame,
+)
 from app.services.db.supabase import (
     get_conversations,
     get_messages,
-    save_message,
+    save_messages,
+    new_message_row,
 )
 from app.services.agent.react_agent import run_agent_stream
-from app.services.tools.google_trends_mcp import get_mcp_client_config
-from langchain_mcp_adapters.client import MultiServerMCPClient
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
 
+# ── SSE frame encoding ──────────────────────────────────────────────────────
+# Events are sent as pre-built SSE frames (bytes) with msgspec Struct
+# payloads — see schemas/events.py. Tool events only ever carry a handful of
+# distinct tool names, so their frames are built once per name and reused.
+@lru_cache(maxsize=256)
+def _tool_frame(event: str, tool_name: str) -> bytes:
+    """Return the (cached) tool_start/tool_end frame for a tool."""
+    return sse_frame(event, ToolEvent(tool_name))
+
+
+# ── Background saves ────────────────────────────────────────────────────────
+# Saves that must outlive a stream whose client disconnected. The loop only
+# keeps weak references to tasks, so they're held here until they finish.
+_background_saves: set[asyncio.Task] = set()
+
+
+def _save_in_background(rows: list[dict], access_token: str) -> asyncio.Task:
+    """
+    Run save_messages() as its own task, so cancelling the caller can't stop it.
+
+    Returns:
+        asyncio.Task: The save — await it through asyncio.shield() to wait
+            for it without letting a cancellation reach the insert.
+    """
+    task = asyncio.create_task(save_messages(rows, access_token=access_token))
+    _background_saves.add(task)
+    task.add_done_callback(_background_saves.discard)
+    return task
+
+
 @router.get("/conversations", response_model=list[ConversationOut])
 async def list_conversations(request: Request):
     """
@@ -66,7 +106,7 @@ async def list_conversations(request: Request):
     """
     user_id = request.state.user_id
     token = request.state.access_token
-    conversations = get_conversations(user_id, access_token=token)
+    conversations = await get_conversations(user_id, access_token=token)
     return conversations
 
 
@@ -90,7 +130,7 @@ async def list_messages(conversation_id: str, request: Request):
     """
     user_id = request.state.user_id
     token = request.state.access_token
-    messages = get_messages(conversation_id, user_id, access_token=token)
+    messages = await get_messages(conversation_id, user_id, access_token=token)
     return messages
 
 
@@ -100,12 +140,13 @@ async def send_message(req: ChatRequest, request: Request):
     Send a user message and stream the AI response via Server-Sent Events (SSE).
 
     This is the core endpoint that ties everything together:
-    1. Saves the user's message to Supabase.
-    2. Loads MCP tools from the Google Trends MCP server (gracefully skips if down).
-    3. Runs the LangChain ReAct agent with the user's message + chat history.
-    4. Streams the agent's response tokens and tool activity events to the frontend.
-    5. Saves the complete AI response to Supabase.
-    6. Sends a final "done" event with the conversation_id.
+    1. Runs the LangChain ReAct agent with the user's message + chat history
+       (the agent loads the Google Trends MCP tools itself and gracefully
+       skips them if the server is down).
+    2. Streams the agent's response tokens and tool activity events to the frontend.
+    3. Saves the user's message and the complete AI response to Supabase in
+       one insert (just the user's message if the client disconnects first).
+    4. Sends a final "done" event with the conversation_id.
 
     Args:
         req (ChatRequest): JSON body with `message` (string) and optional `conversation_id`.
@@ -116,6 +157,7 @@ async def send_message(req: ChatRequest, request: Request):
             - "token": {"content": "partial text"}
             - "tool_start": {"tool": "tavily_search"}
             - "tool_end": {"tool": "tavily_search"}
+            - "tool_progress": {"tool": "get_top_news", "progress": 3, "total": 10}
             - "tool_status": {"type": "info", "message": "..."}
             - "done": {"conversation_id": "uuid"}
     """
@@ -125,117 +167,101 @@ async def send_message(req: ChatRequest, request: Request):
     # Generate a new conversation_id if this is a new chat
     conversation_id = req.conversation_id or str(uuid.uuid4())
 
-    # ── Step 1: Save the user's message to Supabase ────────────────────────
-    save_message(
-        conversation_id=conversation_id,
-        user_id=user_id,
-        role="user",
-        content=req.message,
-        access_token=token,
-    )
+    # Built now so its timestamp is when the user sent it; saved together
+    # with the response at the end of the stream (one round trip, not two)
+    user_row = new_message_row(conversation_id, user_id, "user", req.message)
 
     async def event_generator():
         """
         Async generator that yields SSE events as the AI agent processes the message.
 
         This generator:
-        - Attempts to load MCP tools (Google Trends) — skips if unavailable
         - Runs the ReAct agent which may call tools and stream tokens
         - Catches errors and returns user-friendly error messages
-        - Saves the final assistant response to the database
+        - Saves the user's message and the final assistant response to the database
         - Sends a "done" event to signal the stream is complete
         """
         full_response = ""
+        error_message = ""
+        save_task = None
+
         try:
-            # ── Load MCP tools (Google Trends) ─────────────────────────────
-            # If the MCP server is down, we gracefully continue without those
-            # tools. The agent still has Tavily + its own knowledge.
-            mcp_tools = []
             try:
-                config = get_mcp_client_config(access_token=token)
-                mcp_client = MultiServerMCPClient(config)
-                mcp_tools = await mcp_client.get_tools()
-                logger.info(f"MCP tools loaded: {[t.name for t in mcp_tools]}")
+                # ── Stream the ReAct agent's response ──────────────────────
+                # The agent decides which tools to use (if any), calls them,
+                # reasons about the results, and generates a response — all streamed.
+                async for event in run_agent_stream(
+                    user_message=req.message,
+                    conversation_id=conversation_id,
+                    user_id=user_id,
+                    access_token=token,
+                ):
+                    event_type = event["type"]
+
+                    if event_type == "token":
+                        # A chunk of the AI's text response (already coalesced)
+                        yield sse_frame("token", TokenEvent(event["content"]))
+
+                    elif event_type == "tool_start":
+                        # Agent started using a tool (e.g. "tavily_search")
+                        yield _tool_frame("tool_start", event["tool"])
+
+                    elif event_type == "tool_end":
+                        # Agent finished using a tool
+                        yield _tool_frame("tool_end", event["tool"])
+
+                    elif event_type == "tool_progress":
+                        # A running tool reported progress
+                        yield sse_frame("tool_progress", ToolProgressEvent(
+                            tool=event["tool"],
+                            progress=event["progress"],
+                            total=event["total"],
+                        ))
+
+                    elif event_type == "tool_status":
+                        # Informational, e.g. MCP server unavailable
+                        yield sse_frame("tool_status", ToolStatusEvent(type="info", message=event["message"]))
+
+                    elif event_type == "done":
+                        # Agent completed — capture the full response
+                        full_response = event["content"]
+
+            except ValueError as e:
+                # Missing API key — log details server-side only, send generic message to client
+                logger.error(f"Configuration error: {e}")
+                error_message = "Configuration error. Please contact the administrator."
+
             except Exception:
-                # MCP server unavailable — log server-side only, don't crash
-                logger.warning("MCP connection failed — continuing without Google Trends tools")
-                yield {
-                    "event": "tool_status",
-                    "data": json.dumps({"type": "info", "message": "Google Trends MCP unavailable, continuing without it"}),
-                }
-
-            # ── Stream the ReAct agent's response ──────────────────────────
-            # The agent decides which tools to use (if any), calls them,
-            # reasons about the results, and generates a response — all streamed.
-            async for event in run_agent_stream(
-                user_message=req.message,
-                conversation_id=conversation_id,
-                user_id=user_id,
-                access_token=token,
-                mcp_tools=mcp_tools,
-            ):
-                event_type = event["type"]
-
-                if event_type == "token":
-                    # A chunk of the AI's text response
-                    full_response += event["content"]
-                    yield {
-                        "event": "token",
-                        "data": json.dumps({"content": event["content"]}),
-                    }
-
-                elif event_type == "tool_start":
-                    # Agent started using a tool (e.g. "tavily_search")
-                    yield {
-                        "event": "tool_start",
-                        "data": json.dumps({"tool": event["tool"]}),
-                    }
-
-                elif event_type == "tool_end":
-                    # Agent finished using a tool
-                    yield {
-                        "event": "tool_end",
-                        "data": json.dumps({"tool": event["tool"]}),
-                    }
-
-                elif event_type == "done":
-                    # Agent completed — capture the full response
-                    full_response = event["content"]
-
-        except ValueError as e:
-            # Missing API key — log details server-side only, send generic message to client
-            logger.error(f"Configuration error: {e}")
-            full_response = "Configuration error. Please contact the administrator."
-            yield {
-                "event": "token",
-                "data": json.dumps({"content": full_response}),
-            }
-
-        except Exception:
-            # Unexpected error — log full traceback server-side, send generic message to client
-            logger.error(f"Agent error for user {user_id}: {traceback.format_exc()}")
-            full_response = "Sorry, something went wrong processing your request. Please try again."
-            yield {
-                "event": "token",
-                "data": json.dumps({"content": full_response}),
-            }
-
-        # ── Save the assistant's response to Supabase ──────────────────────
-        if full_response:
-            save_message(
-                conversation_id=conversation_id,
-                user_id=user_id,
-                role="assistant",
-                content=full_response,
-                access_token=token,
-            )
+                # Unexpected error — log full traceback server-side, send generic message to client
+                logger.error(f"Agent error for user {user_id}: {traceback.format_exc()}")
+                error_message = "Sorry, something went wrong processing your request. Please try again."
+
+            # Sent here rather than in the handlers above, so a disconnect
+            # during this yield is still caught below
+            if error_message:
+                full_response = error_message
+                yield sse_frame("token", TokenEvent(error_message))
+
+            # ── Save the exchange to Supabase (one insert) ─────────────────
+            # Shielded: a disconnect now cancels only this wait, never the
+            # insert of a reply the user has already seen
+            rows = [user_row]
+            if full_response:
+                rows.append(new_message_row(conversation_id, user_id, "assistant", full_response))
+            save_task = _save_in_background(rows, token)
+            await asyncio.shield(save_task)
+
+        except (asyncio.CancelledError, GeneratorExit):
+            # Client disconnected mid-stream — the generator is being torn
+            # down and can't await, but the user's message must still
+            # persist (unless the final save is already underway)
+            if save_task is None:
+                _save_in_background([user_row], token)
+            raise
 
         # ── Send the final "done" event ────────────────────────────────────
         # This tells the frontend the stream is complete and provides the
         # conversation_id (important for new chats that didn't have one yet).
-        yield {
-            "event": "done",
-            "data": json.dumps({"conversation_id": conversation_id}),
-        }
+        yield sse_frame("done", DoneEvent(conversation_id))
 
     return EventSourceResponse(event_generator())
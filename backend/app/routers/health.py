@@ -9,7 +9,7 @@ Purpose:
     - Load balancers / monitoring: quick liveness probe.
     - Frontend: can ping this before attempting auth calls.
 
-This endpoint is listed in PUBLIC_PATHS (middleware/auth.py) so it
+This endpoint is listed in PUBLIC_EXACT (middleware/auth.py) so it
 does NOT require authentication — anyone can call it.
 """
 
@@ -11,7 +11,14 @@ Models:
     ErrorResponse → Standard error shape (used by FastAPI's HTTPException)
 """
 
-from pydantic import BaseModel, EmailStr
+from typing import Annotated
+from pydantic import BaseModel, StringConstraints
+
+# ── Email format ────────────────────────────────────────────────────────────
+# A cheap compiled-regex sanity check ("something@domain.tld") instead of
+# EmailStr, which pulls in the email-validator package and runs a full RFC
+# parse on every request. Supabase rejects truly malformed addresses anyway.
+Email = Annotated[str, StringConstraints(pattern=r"^[^@\s]+@[^@\s]+\.[^@\s]+$", max_length=320)]
 
 
 class AuthRequest(BaseModel):
@@ -19,14 +26,14 @@ class AuthRequest(BaseModel):
     Request body for signup and login.
 
     Fields:
-        email    (EmailStr): User's email address. Pydantic validates the format
-                             automatically (e.g. rejects "not-an-email").
+        email    (Email):    User's email address. Pydantic checks the basic
+                             shape (e.g. rejects "not-an-email").
         password (str):      User's password. Supabase enforces minimum strength.
 
     Example JSON:
         { "email": "user@example.com", "password": "MySecure123!" }
     """
-    email: EmailStr
+    email: Email
     password: str
 
 
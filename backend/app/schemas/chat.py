@@ -8,11 +8,19 @@ Models:
     ChatRequest     → Input for POST /chat/send
     MessageOut      → A single message in a conversation (used in GET messages)
     ConversationOut → A conversation summary (used in GET conversations)
+
+Config:
+    All models are frozen and ignore unknown keys. The list endpoints return
+    the PostgREST rows as plain dicts and let FastAPI validate them against
+    `response_model` in pydantic-core — cheaper than building the models in
+    Python first with model_construct().
 """
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import Optional
 
+_MODEL_CONFIG = ConfigDict(frozen=True, extra="ignore")
+
 
 class ChatRequest(BaseModel):
     """
@@ -29,6 +37,8 @@ class ChatRequest(BaseModel):
     Example JSON (existing conversation):
         { "message": "Tell me more", "conversation_id": "668c3916-..." }
     """
+    model_config = _MODEL_CONFIG
+
     message: str
     conversation_id: Optional[str] = None
 
@@ -48,6 +58,8 @@ class MessageOut(BaseModel):
     Used by:
         GET /chat/conversations/{id}/messages
     """
+    model_config = _MODEL_CONFIG
+
     id: str
     conversation_id: str
     user_id: str
@@ -69,6 +81,8 @@ class ConversationOut(BaseModel):
     Used by:
         GET /chat/conversations
     """
+    model_config = _MODEL_CONFIG
+
     id: str
     title: str
     created_at: str
@@ -0,0 +1,80 @@
+"""
+events.py — SSE Event Payloads (msgspec)
+========================================
+
+Defines the `data` payloads streamed by POST /chat/send.
+
+These are msgspec Structs rather than Pydantic models: one is encoded for
+every token the agent streams, and msgspec's C encoder serialises a Struct
+straight from its fields — no intermediate dict, no validation pass.
+
+Models:
+    TokenEvent      → "token":       {"content": "partial text"}
+    ToolEvent       → "tool_start" / "tool_end": {"tool": "tavily_search"}
+    ToolProgressEvent → "tool_progress": {"tool": "get_top_news", "progress": 3, "total": 10}
+    ToolStatusEvent → "tool_status": {"type": "info", "message": "..."}
+    DoneEvent       → "done":        {"conversation_id": "uuid"}
+
+Framing:
+    sse_frame() returns the complete SSE frame as bytes, which
+    EventSourceResponse sends as-is. Yielding {"event": ..., "data": ...}
+    dicts instead would build a ServerSentEvent per event, re-scan the data
+    for newlines and re-encode the text — per token. msgspec's JSON never
+    contains a raw CR/LF (they're escaped), so one `data:` line is always
+    valid.
+
+Usage:
+    from app.schemas.events import TokenEvent, sse_frame
+    yield sse_frame("token", TokenEvent("Hello"))
+"""
+
+import msgspec
+
+
+class TokenEvent(msgspec.Struct):
+    """A chunk of the AI's response text."""
+    content: str
+
+
+class ToolEvent(msgspec.Struct):
+    """The agent started or finished using a tool."""
+    tool: str
+
+
+class ToolProgressEvent(msgspec.Struct):
+    """Progress reported by a running tool (total is None if unknown)."""
+    tool: str
+    progress: float
+    total: float | None
+
+
+class ToolStatusEvent(msgspec.Struct):
+    """Informational message about tool availability (e.g. MCP down)."""
+    type: str
+    message: str
+
+
+class DoneEvent(msgspec.Struct):
+    """Final event — tells the frontend which conversation the reply belongs to."""
+    conversation_id: str
+
+
+# One reusable encoder (avoids re-creating encoder state per event)
+ENCODER = msgspec.json.Encoder()
+
+
+def sse_frame(event: str, payload: msgspec.Struct) -> bytes:
+    """
+    Build a complete, ready-to-send SSE frame for one event.
+
+    Uses "\r\n" line endings, sse-starlette's default separator, so these
+    frames match the pings EventSourceResponse sends itself.
+
+    Args:
+        event:   SSE event name (e.g. "token").
+        payload: The event's data, encoded as JSON.
+
+    Returns:
+        bytes: b"event: <event>\r\ndata: <json>\r\n\r\n"
+    """
+    return b"event: %s\r\ndata: %s\r\n\r\n" % (event.encode(), ENCODER.encode(payload))
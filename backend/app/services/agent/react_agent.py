@@ -27,8 +27,39 @@ How the agent decides which tool to use:
       → "Google Trends"  → uses an MCP tool (e.g. get_trending_terms)
       → General question  → answers from its own knowledge (no tool call)
 
+Prompt layout (OpenAI prefix caching):
+    OpenAI caches the longest prompt prefix it has seen recently, so each turn
+    is assembled from the most stable part to the most volatile:
+        [system prompt][committed history][dynamic context][new user message]
+    The system prompt and history are byte-identical to last turn's, so only
+    the tail is billed and prefilled at full price. Anything that changes per
+    request (e.g. today's date) goes after the history, never before it.
+
+History budget:
+    Sending the whole conversation every turn makes input tokens grow with
+    every message (O(N²) billed over N turns). trim_history() keeps only the
+    most recent messages that fit MAX_HISTORY_TOKENS, counted with tiktoken.
+    The cut is quantized (see HISTORY_TRIM_STEP), so the kept history starts
+    at the same message for many turns in a row and the cached prompt prefix
+    survives the trim.
+
+Caching:
+    The ChatOpenAI instance (and its HTTP connection pool to OpenAI) is
+    created once per process, and compiled agent graphs are reused for the
+    same set of tool objects — see get_llm() and create_agent().
+
+MCP intent gate:
+    Discovering the Google Trends MCP tools costs an HTTP round trip (a new
+    MCP session) per turn. needs_trends_tools() is a cheap keyword check on
+    the message and the previous exchange; chats that clearly aren't about
+    news or trends skip MCP entirely and run with Tavily alone (and a system
+    prompt that doesn't mention the MCP tools).
+
 Functions:
+    trim_history()        → Keep the newest messages that fit the token budget
     build_chat_history()  → Convert DB messages to LangChain message objects
+    build_prompt()        → Assemble the cache-friendly message list for a turn
+    needs_trends_tools()  → Decide whether a turn should load the MCP tools
     get_llm()             → Create the ChatOpenAI LLM instance
     create_agent()        → Build the ReAct agent with tools
     run_agent_stream()    → Execute the agent and yield streaming events
@@ -37,10 +68,77 @@ Functions:
 from langchain_openai import ChatOpenAI
 from langgraph.prebuilt import create_react_agent
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
-from app.core.config import settings
+from app.core.config import get_settings
+from app.core.http import get_http_client
 from app.services.tools.tavily import get_tavily_tool
+from app.services.tools.google_trends_mcp import load_mcp_tools
 from app.services.db.supabase import get_messages
+from cachetools import TTLCache
+from datetime import datetime, timezone
+from functools import lru_cache
+import asyncio
+import logging
 import os
+import re
+import time
+import tiktoken
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+LLM_MODEL = "gpt-4o-mini"
+
+# ── LLM / agent caches ──────────────────────────────────────────────────────
+_llm: ChatOpenAI | None = None
+
+# Tool-object ids → compiled ReAct graph. Keyed by identity, not tool names:
+# MCP tools carry the user's JWT, so two users' same-named tools must never
+# share a graph. The cached graph references its tools, so their ids can't
+# be reused while the entry lives. The TTL matches the MCP tool cache
+# (google_trends_mcp._mcp_tools_cache), after which a token gets new tools
+# anyway.
+_agent_cache: TTLCache = TTLCache(maxsize=1_000, ttl=60)
+
+# ── Token coalescing ────────────────────────────────────────────────────────
+# LLM tokens are often a few characters each; sending one SSE frame per token
+# means one encode + ASGI send + TCP write per token. run_agent_stream()
+# buffers tokens and yields one combined "token" event once
+# TOKEN_FLUSH_CHARS characters are pending or TOKEN_FLUSH_INTERVAL seconds
+# have passed — still well under what a reader perceives as "typing". The
+# buffer is always flushed before tool/done events so the frontend sees
+# everything in order.
+TOKEN_FLUSH_CHARS = 32
+TOKEN_FLUSH_INTERVAL = 0.03  # seconds
+
+# ── History budget ──────────────────────────────────────────────────────────
+# Upper bound on history tokens sent per turn (the model's window is far
+# larger; this caps cost and prefill time on long conversations).
+MAX_HISTORY_TOKENS = 8_000
+# Chat-format overhead per message (role + separators), per OpenAI's cookbook
+TOKENS_PER_MESSAGE = 4
+# Once over budget, the oldest messages are dropped in whole steps of
+# HISTORY_TRIM_STEP tokens (counted from the start of the conversation)
+# rather than one message at a time. A window sliding one message per turn
+# changes the first history message on every turn, leaving only the system
+# prompt (below OpenAI's 1024-token caching minimum) as a cacheable prefix.
+# With steps, the cut stays put until another HISTORY_TRIM_STEP tokens of
+# conversation arrive; the kept history is 50-100% of the budget.
+HISTORY_TRIM_STEP = MAX_HISTORY_TOKENS // 2
+
+# ── MCP intent gate ─────────────────────────────────────────────────────────
+# Words that suggest the Google Trends / News tools are wanted — news is
+# the app's core feature, so the gate errs on the side of loading them and
+# only skips MCP for turns that clearly don't need it. Matched as word
+# prefixes, so "trend" also covers "trends" and "trending", and "top stor"
+# covers "top story" / "top stories".
+_TRENDS_INTENT = re.compile(
+    r"\b(?:trend|news|headline|top stor|viral|latest|breaking)",
+    re.IGNORECASE,
+)
+# Previous messages also checked, so follow-ups ("what about the 2nd one?")
+# in a trends conversation keep the tools.
+TRENDS_INTENT_LOOKBACK = 2
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -61,6 +159,104 @@ Guidelines:
 - When using tool results, summarize them naturally — don't just dump raw data.
 """
 
+# For agents built without the MCP tools (turns skipped by the intent gate,
+# or the MCP server down), so the model isn't told about tools it can't call.
+SYSTEM_PROMPT_WEB_ONLY = """You are a helpful AI assistant with access to tools.
+You can search the web using Tavily.
+
+Guidelines:
+- Use tavily_search when the user wants to find information on the web or about recent events.
+- If the user asks a general knowledge question, answer from your own knowledge without using tools.
+- Always provide clear, concise, and helpful responses.
+- When using tool results, summarize them naturally — don't just dump raw data.
+"""
+
+# Built once: every agent shares one of these message objects instead of
+# wrapping the string in a new SystemMessage per agent.
+_SYSTEM_MESSAGE = SystemMessage(content=SYSTEM_PROMPT)
+_SYSTEM_MESSAGE_WEB_ONLY = SystemMessage(content=SYSTEM_PROMPT_WEB_ONLY)
+
+
+# Stored role → LangChain message class (unknown roles are skipped). No
+# "tool" entry: the messages table only stores user/assistant/system rows,
+# and a ToolMessage can't be rebuilt without its tool_call_id.
+_ROLE_CLS = {
+    "user": HumanMessage,
+    "assistant": AIMessage,
+    "system": SystemMessage,
+}
+
+
+@lru_cache(maxsize=1)
+def _get_encoding() -> tiktoken.Encoding | None:
+    """Load the model's tokenizer once (None if it can't be loaded)."""
+    try:
+        return tiktoken.encoding_for_model(LLM_MODEL)
+    except Exception:
+        # BPE file not cached and no network — fall back to an estimate
+        logger.warning("tiktoken encoding unavailable — estimating history tokens")
+        return None
+
+
+@lru_cache(maxsize=4_096)
+def _count_tokens(text: str) -> int:
+    """
+    Count the tokens in one message's content.
+
+    Cached by content: the same history is re-counted every turn, and only
+    the newest messages are new.
+    """
+    encoding = _get_encoding()
+    if encoding is None:
+        return len(text) // 4 + 1  # ~4 characters per token for English
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def trim_history(
+    messages: list[dict],
+    max_tokens: int = MAX_HISTORY_TOKENS,
+    step: int = HISTORY_TRIM_STEP,
+) -> list[dict]:
+    """
+    Drop the oldest messages, in whole steps, until the rest fit in `max_tokens`.
+
+    The number of tokens to drop is rounded up to a multiple of `step`, and
+    the cut is the first message boundary at or after that many tokens from
+    the start of the conversation. Both only change when the conversation
+    grows by another `step` tokens, so the kept history keeps the same first
+    message (and the LLM its cached prompt prefix) turn after turn.
+
+    Args:
+        messages   (list[dict]): Stored messages, oldest first (get_messages()).
+        max_tokens (int):        Token budget for the history.
+        step       (int):        Granularity of the cut, in tokens.
+
+    Returns:
+        list[dict]: The newest messages whose total fits the budget, still
+            oldest first. The list is returned as-is when it already fits.
+    """
+    counts = [_count_tokens(msg["content"]) + TOKENS_PER_MESSAGE for msg in messages]
+    total = sum(counts)
+    if total <= max_tokens:
+        return messages
+
+    # A multiple of `step`, and always more than the overflow
+    drop = ((total - max_tokens) // step + 1) * step
+    dropped = 0
+    for i, count in enumerate(counts):
+        if dropped >= drop:
+            return messages[i:]
+        dropped += count
+
+    # The cut landed inside the newest message — keep the newest messages
+    # that fit instead of sending no history at all.
+    kept = 0
+    for i in range(len(messages) - 1, -1, -1):
+        kept += counts[i]
+        if kept > max_tokens:
+            return messages[i + 1:]
+    return messages
+
 
 def build_chat_history(messages: list[dict]) -> list:
     """
@@ -75,7 +271,9 @@ def build_chat_history(messages: list[dict]) -> list:
             - content: The message text
 
     Returns:
-        list: LangChain message objects in chronological order.
+        list: LangChain message objects in chronological order. Only `content`
+            is used — ids and timestamps stay out of the prompt so the same
+            history always renders to the same bytes (see "Prompt layout").
 
     Example:
         Input:  [{"role": "user", "content": "Hello"}, {"role": "assistant", "content": "Hi!"}]
@@ -87,20 +285,64 @@ def build_chat_history(messages: list[dict]) -> list:
         asks "What's my name?" in message 3, the agent can answer correctly
         because it sees the full conversation history.
     """
-    history = []
-    for msg in messages:
-        if msg["role"] == "user":
-            history.append(HumanMessage(content=msg["content"]))
-        elif msg["role"] == "assistant":
-            history.append(AIMessage(content=msg["content"]))
-        elif msg["role"] == "system":
-            history.append(SystemMessage(content=msg["content"]))
-    return history
+    return [
+        cls(content=msg["content"])
+        for msg in messages
+        if (cls := _ROLE_CLS.get(msg["role"])) is not None
+    ]
+
+
+def build_prompt(chat_history: list, user_message: str) -> list:
+    """
+    Assemble the messages for one agent turn in prefix-cache-friendly order.
+
+    The system prompt is prepended by the agent itself (_SYSTEM_MESSAGE or
+    _SYSTEM_MESSAGE_WEB_ONLY, as create_react_agent's `prompt`), so the full prompt the LLM sees is:
+        [SYSTEM_PROMPT][chat_history][dynamic context][user_message]
+
+    Args:
+        chat_history (list): Committed history from build_chat_history().
+        user_message (str):  The user's current message.
+
+    Returns:
+        list: LangChain messages ready for the agent's {"messages": ...} input.
+    """
+    # Volatile context lives after the history so it never shifts the
+    # cached prefix. Day granularity keeps it stable within a day.
+    today = datetime.now(timezone.utc).strftime("%A, %d %B %Y")
+    dynamic_context = SystemMessage(content=f"Today's date (UTC) is {today}.")
+    return [*chat_history, dynamic_context, HumanMessage(content=user_message)]
+
+
+def needs_trends_tools(user_message: str, stored_messages: list[dict] = ()) -> bool:
+    """
+    Cheap keyword check: could this turn need the Google Trends MCP tools?
+
+    Args:
+        user_message    (str):        The user's current message.
+        stored_messages (list[dict]): Conversation history, oldest first; the
+            last TRENDS_INTENT_LOOKBACK messages are checked as well.
+
+    Returns:
+        bool: True if the message (or the previous exchange) mentions news,
+            trends, headlines, top stories, breaking/latest events or virality.
+    """
+    if _TRENDS_INTENT.search(user_message):
+        return True
+    return any(
+        _TRENDS_INTENT.search(msg["content"])
+        for msg in stored_messages[-TRENDS_INTENT_LOOKBACK:]
+    )
 
 
 def get_llm():
     """
-    Create the ChatOpenAI LLM instance.
+    Return the process-wide ChatOpenAI LLM instance, creating it on first call.
+
+    Reusing one instance keeps its HTTP client — and keep-alive connections
+    to OpenAI — across requests instead of paying a TLS handshake each time.
+    The client is the worker's shared pool (app/core/http.py); if that pool
+    has been replaced (closed on shutdown), the LLM is rebuilt on it.
 
     Returns:
         ChatOpenAI: Configured with:
@@ -117,10 +359,19 @@ def get_llm():
         - It's fast enough for real-time chat
         - It handles ReAct reasoning well
     """
-    if not settings.OPENAI_API_KEY:
-        raise ValueError("OPENAI_API_KEY is not set")
-    os.environ["OPENAI_API_KEY"] = settings.OPENAI_API_KEY
-    return ChatOpenAI(model="gpt-4o-mini", temperature=0, streaming=True)
+    global _llm
+    http_client = get_http_client()
+    if _llm is None or _llm.http_async_client is not http_client:
+        if not settings.OPENAI_API_KEY:
+            raise ValueError("OPENAI_API_KEY is not set")
+        os.environ["OPENAI_API_KEY"] = settings.OPENAI_API_KEY
+        _llm = ChatOpenAI(
+            model=LLM_MODEL,
+            temperature=0,
+            streaming=True,
+            http_async_client=http_client,
+        )
+    return _llm
 
 
 async def create_agent(mcp_tools: list = None):
@@ -134,10 +385,13 @@ async def create_agent(mcp_tools: list = None):
     Args:
         mcp_tools (list, optional): Tools from the Google Trends MCP server.
             These are LangChain-compatible tools created by langchain-mcp-adapters.
-            If the MCP server is down, this will be an empty list.
+            Empty or None when the MCP server is down or the turn doesn't
+            need them — the agent then gets SYSTEM_PROMPT_WEB_ONLY, which
+            doesn't mention the MCP tools.
 
     Returns:
-        CompiledGraph: A LangGraph agent ready to process messages.
+        CompiledGraph: A LangGraph agent ready to process messages. Compiled
+            once per distinct set of tool objects and reused (see _agent_cache).
 
     Tool priority (decided by the LLM based on the user's query):
         1. Tavily Search → for web searches, current events, factual lookups
@@ -155,6 +409,11 @@ async def create_agent(mcp_tools: list = None):
     if mcp_tools:
         tools.extend(mcp_tools)
 
+    cache_key = tuple(id(tool) for tool in tools)
+    agent = _agent_cache.get(cache_key)
+    if agent is not None:
+        return agent
+
     # Create the LLM
     llm = get_llm()
 
@@ -166,9 +425,10 @@ async def create_agent(mcp_tools: list = None):
     agent = create_react_agent(
         model=llm,
         tools=tools,
-        prompt=SYSTEM_PROMPT,
+        prompt=_SYSTEM_MESSAGE if mcp_tools else _SYSTEM_MESSAGE_WEB_ONLY,
     )
 
+    _agent_cache[cache_key] = agent
     return agent
 
 
@@ -177,32 +437,35 @@ async def run_agent_stream(
     conversation_id: str,
     user_id: str,
     access_token: str,
-    mcp_tools: list = None,
 ):
     """
     Run the ReAct agent and yield streaming events for SSE.
 
     This is the main entry point called by the /chat/send endpoint.
     It orchestrates the full flow:
-        1. Load conversation history from Supabase
+        1. Load conversation history from Supabase and, if the turn looks
+           like it needs them (needs_trends_tools), the MCP tools
         2. Build LangChain message objects
         3. Create the ReAct agent with tools
         4. Stream the agent's execution, yielding events for:
            - Tool starts/ends (so frontend shows "Using tavily_search...")
-           - Token chunks (so frontend shows text appearing incrementally)
+           - Tool progress, for MCP tools that report it (e.g. "3/10")
+           - Token chunks (so frontend shows text appearing incrementally;
+             coalesced, see TOKEN_FLUSH_CHARS / TOKEN_FLUSH_INTERVAL)
            - Final complete response
 
     Args:
         user_message    (str):  The user's current message.
         conversation_id (str):  UUID of the conversation (for loading history).
         user_id         (str):  UUID of the user (for Supabase queries).
-        access_token    (str):  User's JWT (for RLS-authenticated DB access).
-        mcp_tools       (list): MCP tools to give to the agent (may be empty).
+        access_token    (str):  User's JWT (for RLS-authenticated DB access and MCP).
 
     Yields:
         dict: Event dictionaries with different types:
             {"type": "tool_start", "tool": "tavily_search"}
             {"type": "tool_end",   "tool": "tavily_search"}
+            {"type": "tool_progress", "tool": "get_top_news", "progress": 3, "total": 10}
+            {"type": "tool_status", "message": "Google Trends MCP unavailable, ..."}
             {"type": "token",      "content": "partial text chunk"}
             {"type": "done",       "content": "full response text"}
 
@@ -215,24 +478,55 @@ async def run_agent_stream(
         6. ... more tokens ...
         7. yield {"type": "done",       "content": "Based on my search, LangChain..."}
     """
-    # ── Step 1: Load conversation history from Supabase ────────────────────
-    # This gives the agent context from previous messages in this conversation.
-    # Without this, the agent wouldn't remember anything from earlier messages.
-    stored_messages = get_messages(conversation_id, user_id, access_token=access_token)
-    chat_history = build_chat_history(stored_messages)
-
-    # ── Step 2: Add the new user message ───────────────────────────────────
-    chat_history.append(HumanMessage(content=user_message))
+    # ── Step 1: Load history (Supabase) and, if needed, MCP tools ──────────
+    # History gives the agent context from previous messages in this
+    # conversation. When the message itself asks for trends, both network
+    # round trips are overlapped, making the wait before the first token
+    # max(db, mcp) instead of the sum. Otherwise MCP is only loaded if the
+    # previous exchange was about trends (a follow-up question).
+    if needs_trends_tools(user_message):
+        stored_messages, mcp_tools = await asyncio.gather(
+            get_messages(conversation_id, user_id, access_token=access_token),
+            load_mcp_tools(access_token),
+        )
+    else:
+        stored_messages = await get_messages(conversation_id, user_id, access_token=access_token)
+        mcp_tools = []
+        if needs_trends_tools("", stored_messages):
+            mcp_tools = await load_mcp_tools(access_token)
+    if mcp_tools is None:
+        # MCP server down — the agent still has Tavily + its own knowledge
+        yield {
+            "type": "tool_status",
+            "message": "Google Trends MCP unavailable, continuing without it",
+        }
+    chat_history = build_chat_history(trim_history(stored_messages))
+
+    # ── Step 2: Assemble [history][dynamic context][new user message] ──────
+    chat_history = build_prompt(chat_history, user_message)
 
     # ── Step 3: Create the ReAct agent ─────────────────────────────────────
     agent = await create_agent(mcp_tools=mcp_tools)
 
     # ── Step 4: Stream agent execution ─────────────────────────────────────
     # astream_events() gives us granular events as the agent works:
+    #   - on_chat_model_stream: LLM is generating text (token by token)
     #   - on_tool_start: agent is about to call a tool
     #   - on_tool_end:   tool returned a result
-    #   - on_chat_model_stream: LLM is generating text (token by token)
-    full_response = ""
+    #   - on_custom_event "tool_progress": an MCP tool reported progress
+    response_parts: list[str] = []   # every token, joined once at the end
+    pending: list[str] = []          # tokens not yet yielded
+    pending_chars = 0
+    last_flush = time.monotonic()
+
+    def flush_tokens() -> dict:
+        """Drain `pending` into a single "token" event."""
+        nonlocal pending_chars, last_flush
+        content = "".join(pending)
+        pending.clear()
+        pending_chars = 0
+        last_flush = time.monotonic()
+        return {"type": "token", "content": content}
 
     async for event in agent.astream_events(
         {"messages": chat_history},
@@ -240,11 +534,33 @@ async def run_agent_stream(
     ):
         kind = event["event"]
 
+        # ── LLM token streaming ───────────────────────────────────────────
+        # The LLM is generating its response. Each chunk is a small piece
+        # of text (could be a word, part of a word, or punctuation).
+        # We stream these to the frontend for a typing effect, a few
+        # tokens per event (see TOKEN_FLUSH_CHARS / TOKEN_FLUSH_INTERVAL).
+        # Checked first: nearly every event in a run is one of these.
+        if kind == "on_chat_model_stream":
+            chunk = event["data"].get("chunk")
+            if chunk and hasattr(chunk, "content") and chunk.content:
+                content = chunk.content
+                if isinstance(content, str):
+                    response_parts.append(content)
+                    pending.append(content)
+                    pending_chars += len(content)
+                    if (
+                        pending_chars >= TOKEN_FLUSH_CHARS
+                        or time.monotonic() - last_flush >= TOKEN_FLUSH_INTERVAL
+                    ):
+                        yield flush_tokens()
+
         # ── Tool started ───────────────────────────────────────────────────
         # The agent decided to use a tool. Notify the frontend so it can
         # show "Using tavily_search..." or "Fetching Google Trends...".
-        if kind == "on_tool_start":
+        elif kind == "on_tool_start":
             tool_name = event.get("name", "unknown")
+            if pending:
+                yield flush_tokens()
             yield {
                 "type": "tool_start",
                 "tool": tool_name,
@@ -254,29 +570,32 @@ async def run_agent_stream(
         # The tool returned results. The agent will now reason about them.
         elif kind == "on_tool_end":
             tool_name = event.get("name", "unknown")
+            if pending:
+                yield flush_tokens()
             yield {
                 "type": "tool_end",
                 "tool": tool_name,
             }
 
-        # ── LLM token streaming ───────────────────────────────────────────
-        # The LLM is generating its response. Each chunk is a small piece
-        # of text (could be a word, part of a word, or punctuation).
-        # We stream these to the frontend for a typing effect.
-        elif kind == "on_chat_model_stream":
-            chunk = event["data"].get("chunk")
-            if chunk and hasattr(chunk, "content") and chunk.content:
-                content = chunk.content
-                if isinstance(content, str):
-                    full_response += content
-                    yield {
-                        "type": "token",
-                        "content": content,
-                    }
+        # ── Tool progress ──────────────────────────────────────────────────
+        # Forwarded MCP progress notifications (google_trends_mcp
+        # ._forward_progress) — lets the frontend show how far along a
+        # long-running tool is instead of waiting silently for on_tool_end.
+        elif kind == "on_custom_event" and event["name"] == "tool_progress":
+            data = event["data"]
+            yield {
+                "type": "tool_progress",
+                "tool": data["tool"] or "unknown",
+                "progress": data["progress"],
+                "total": data["total"],
+            }
+
+    if pending:
+        yield flush_tokens()
 
     # ── Step 5: Yield the final complete response ──────────────────────────
     # This lets the caller know the full text for saving to the database.
     yield {
         "type": "done",
-        "content": full_response,
+        "content": "".join(response_parts),
     }
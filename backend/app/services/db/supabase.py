@@ -5,18 +5,33 @@ supabase.py — Supabase Database Service (Messages & Conversations)
 Handles all database operations for chat messages stored in Supabase PostgreSQL.
 
 Key concepts:
-    - We use Supabase's Python client to interact with the `messages` table.
+    - We call Supabase's PostgREST API (/rest/v1) directly with the shared
+      Supabase httpx client (core/http.py) — natively async, so DB
+      calls never block the event loop, and they reuse its keep-alive pool.
     - Row Level Security (RLS) is enabled: users can only read/write their own messages.
-    - To make RLS work, we pass the user's JWT access_token to the Supabase client
-      via `client.postgrest.auth(token)`. This tells Supabase "this request is from
-      user X" so the RLS policies (auth.uid() = user_id) are enforced.
+    - To make RLS work, every query carries the user's JWT in its own
+      Authorization header (_auth_headers). This tells Supabase "this request
+      is from user X" so the RLS policies (auth.uid() = user_id) are enforced.
+      The header is per request, never set on the shared client, so
+      concurrent users' tokens can't bleed into each other's queries.
 
 Functions:
-    get_supabase_client()  → Create a Supabase client (with optional JWT for RLS)
+    new_message_row()      → Build a messages row (id + timestamp) without saving it
     save_message()         → Insert a new message into the messages table
+    save_messages()        → Insert several message rows in one request
     get_messages()         → Fetch all messages in a conversation (chronological)
     get_conversations()    → List all conversations for a user (with titles)
 
+Errors:
+    Failed requests raise httpx.HTTPStatusError (or another httpx.HTTPError
+    on network failures).
+
+Database schema (conversation_summaries view):
+    Defined in the README's SQL. Aggregates `messages` server-side into one
+    row per conversation (id, user_id, title, created_at, updated_at), so
+    listing conversations transfers a row per conversation instead of every
+    message the user ever sent.
+
 Database schema (messages table):
     id              UUID        Primary key (auto-generated)
     user_id         UUID        References auth.users(id)
@@ -26,42 +41,81 @@ Database schema (messages table):
     created_at      TIMESTAMPTZ Auto-set to now()
 """
 
-from supabase import create_client, Client
-from app.core.config import settings
-from typing import Optional
+from app.core.config import get_settings
+from app.core.http import get_supabase_client
+from datetime import datetime, timezone
+from operator import itemgetter
+import logging
 import uuid
 
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# Flipped off the first time the conversation_summaries view can't be read
+# (database created before the view was added); get_conversations() then
+# sticks to the client-side grouping until the next restart.
+_summaries_view_available = True
+# PostgREST "table/view not found" (schema cache) and Postgres undefined_table
+_MISSING_RELATION_CODES = {"PGRST205", "42P01"}
+
+MESSAGES_PATH = "/rest/v1/messages"
+SUMMARIES_PATH = "/rest/v1/conversation_summaries"
+
 
-def get_supabase_client(access_token: Optional[str] = None) -> Client:
+def _auth_headers(access_token: str = "") -> dict:
     """
-    Create a Supabase client instance.
+    Build the per-request PostgREST auth header.
 
     Args:
-        access_token (Optional[str]): The user's JWT token from Supabase Auth.
-            If provided, it's set on the PostgREST client so that Row Level
-            Security (RLS) policies can identify the authenticated user.
-            If None, the client uses only the anon key (limited by RLS).
+        access_token (str): The user's JWT token from Supabase Auth. If empty,
+            the anon key is sent instead (limited by RLS).
 
     Returns:
-        Client: A configured Supabase client ready for database operations.
+        dict: {"Authorization": "Bearer <token>"}. The `apikey` header is
+            already a default on the shared client.
 
     Why we pass the access_token:
         Supabase RLS policies use `auth.uid()` to check which user is making
-        the request. The anon key alone doesn't carry user identity. By calling
-        `client.postgrest.auth(token)`, we tell PostgREST "this is user X",
+        the request. The anon key alone doesn't carry user identity. The
+        user's JWT as the bearer token tells PostgREST "this is user X",
         and the RLS policy `user_id = auth.uid()` can then match correctly.
     """
-    client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
-    if access_token:
-        client.postgrest.auth(access_token)
-    return client
+    return {"Authorization": f"Bearer {access_token or settings.SUPABASE_KEY}"}
 
 
 # ══════════════════════════════════════════════════════════════════════════════
 # Messages CRUD
 # ══════════════════════════════════════════════════════════════════════════════
 
-def save_message(
+def new_message_row(conversation_id: str, user_id: str, role: str, content: str) -> dict:
+    """
+    Build a `messages` row, stamped with the current time, without saving it.
+
+    created_at is set here rather than by the database default so rows saved
+    together in one insert (save_messages) keep the order they happened in —
+    with now() they would all share the transaction's timestamp.
+
+    Args:
+        conversation_id (str): UUID grouping messages into a conversation.
+        user_id         (str): UUID of the authenticated user.
+        role            (str): "user" or "assistant" (or "system").
+        content         (str): The message text.
+
+    Returns:
+        dict: id, conversation_id, user_id, role, content, created_at.
+    """
+    return {
+        "id": str(uuid.uuid4()),
+        "conversation_id": conversation_id,
+        "user_id": user_id,
+        "role": role,
+        "content": content,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+async def save_message(
     conversation_id: str,
     user_id: str,
     role: str,
@@ -69,11 +123,10 @@ def save_message(
     access_token: str = "",
 ) -> dict:
     """
-    Save a chat message to the Supabase `messages` table.
+    Save a single chat message to the Supabase `messages` table.
 
-    Called twice per chat exchange:
-        1. When the user sends a message (role="user")
-        2. When the AI finishes responding (role="assistant")
+    The chat endpoint saves each exchange with save_messages() instead;
+    this is for one-off rows.
 
     Args:
         conversation_id (str): UUID grouping messages into a conversation.
@@ -90,19 +143,39 @@ def save_message(
         If the token doesn't match, Supabase rejects the insert with a
         "row-level security policy" error.
     """
-    client = get_supabase_client(access_token)
-    data = {
-        "id": str(uuid.uuid4()),
-        "conversation_id": conversation_id,
-        "user_id": user_id,
-        "role": role,
-        "content": content,
-    }
-    result = client.table("messages").insert(data).execute()
-    return result.data[0] if result.data else data
+    data = new_message_row(conversation_id, user_id, role, content)
+    saved = await save_messages([data], access_token=access_token)
+    return saved[0] if saved else data
+
+
+async def save_messages(rows: list[dict], access_token: str = "") -> list[dict]:
+    """
+    Save several message rows in one round trip (PostgREST bulk insert).
+
+    Used by the chat endpoint to save the user's message and the AI's
+    response together once the response is complete.
 
+    Args:
+        rows         (list[dict]): Rows from new_message_row().
+        access_token (str):        User's JWT for RLS authentication.
+
+    Returns:
+        list[dict]: The saved rows from the database.
 
-def get_messages(conversation_id: str, user_id: str, access_token: str = "") -> list[dict]:
+    RLS:
+        Same as save_message() — every row must belong to the token's user,
+        otherwise the whole insert is rejected.
+    """
+    response = await get_supabase_client().post(
+        MESSAGES_PATH,
+        json=rows,
+        headers={**_auth_headers(access_token), "Prefer": "return=representation"},
+    )
+    response.raise_for_status()
+    return response.json() or rows
+
+
+async def get_messages(conversation_id: str, user_id: str, access_token: str = "") -> list[dict]:
     """
     Fetch all messages in a conversation, ordered chronologically.
 
@@ -116,32 +189,37 @@ def get_messages(conversation_id: str, user_id: str, access_token: str = "") ->
         access_token    (str): User's JWT for RLS authentication.
 
     Returns:
-        list[dict]: Messages ordered by created_at ascending (oldest first).
+        list[dict]: Messages ordered by created_at ascending (oldest first),
+            ties broken by id so the order — and the agent's prompt prefix —
+            is identical on every call.
             Each dict has: id, conversation_id, user_id, role, content, created_at.
 
     Security:
         Double protection:
         1. RLS policy: `user_id = auth.uid()` (database level)
-        2. .eq("user_id", user_id) filter (application level)
+        2. user_id=eq.<user_id> filter (application level)
     """
-    client = get_supabase_client(access_token)
-    result = (
-        client.table("messages")
-        .select("*")
-        .eq("conversation_id", conversation_id)
-        .eq("user_id", user_id)
-        .order("created_at", desc=False)
-        .execute()
+    response = await get_supabase_client().get(
+        MESSAGES_PATH,
+        params={
+            "select": "*",
+            "conversation_id": f"eq.{conversation_id}",
+            "user_id": f"eq.{user_id}",
+            "order": "created_at.asc,id.asc",
+        },
+        headers=_auth_headers(access_token),
     )
-    return result.data or []
+    response.raise_for_status()
+    return response.json()
 
 
-def get_conversations(user_id: str, access_token: str = "") -> list[dict]:
+async def get_conversations(user_id: str, access_token: str = "") -> list[dict]:
     """
     List all conversations for a user, with titles and timestamps.
 
-    Since we don't have a separate `conversations` table, we derive
-    conversations from the `messages` table by grouping on conversation_id.
+    Since we don't have a separate `conversations` table, conversations are
+    derived from the `messages` table — by the `conversation_summaries`
+    view, which does the grouping in Postgres.
 
     Title logic:
         The title is the first user message in the conversation, truncated
@@ -154,6 +232,39 @@ def get_conversations(user_id: str, access_token: str = "") -> list[dict]:
     Returns:
         list[dict]: Conversations sorted by most recent activity (newest first).
             Each dict has: id, title, created_at, updated_at.
+    """
+    global _summaries_view_available
+
+    headers = _auth_headers(access_token)
+    if _summaries_view_available:
+        response = await get_supabase_client().get(
+            SUMMARIES_PATH,
+            params={
+                "select": "id,title,created_at,updated_at",
+                "user_id": f"eq.{user_id}",
+                "order": "updated_at.desc",
+            },
+            headers=headers,
+        )
+        if response.is_success:
+            return response.json()
+        try:
+            error = response.json()
+        except ValueError:
+            error = {}
+        if error.get("code") not in _MISSING_RELATION_CODES:
+            response.raise_for_status()
+        logger.warning(
+            f"conversation_summaries view unavailable ({error.get('message')}) — "
+            "grouping messages client-side; run the view SQL from the README"
+        )
+        _summaries_view_available = False
+    return await _group_conversations(user_id, headers)
+
+
+async def _group_conversations(user_id: str, headers: dict) -> list[dict]:
+    """
+    Fallback for get_conversations() when the view doesn't exist yet.
 
     Algorithm:
         1. Fetch ALL messages for this user, ordered by created_at.
@@ -162,36 +273,36 @@ def get_conversations(user_id: str, access_token: str = "") -> list[dict]:
            the latest message timestamp (→ updated_at).
         4. Sort by updated_at descending (most recent first).
     """
-    client = get_supabase_client(access_token)
-    result = (
-        client.table("messages")
-        .select("conversation_id, role, content, created_at")
-        .eq("user_id", user_id)
-        .order("created_at", desc=False)
-        .execute()
+    response = await get_supabase_client().get(
+        MESSAGES_PATH,
+        params={
+            "select": "conversation_id,role,content,created_at",
+            "user_id": f"eq.{user_id}",
+            "order": "created_at.asc",
+        },
+        headers=headers,
     )
-
-    # Group by conversation_id — build conversation summaries
-    seen: dict[str, dict] = {}
-    for msg in (result.data or []):
+    response.raise_for_status()
+
+    # Group by conversation_id in one pass. Entries are plain lists
+    # [id, title, created_at, updated_at] — dicts are only built at the end.
+    # Rows arrive oldest first, so a conversation's first row sets
+    # created_at and each later row just bumps updated_at.
+    seen: dict[str, list] = {}
+    for msg in response.json():
         cid = msg["conversation_id"]
-        if cid not in seen:
-            seen[cid] = {
-                "id": cid,
-                "title": "New Chat",
-                "created_at": msg["created_at"],
-                "updated_at": msg["created_at"],
-            }
+        entry = seen.get(cid)
+        if entry is None:
+            entry = seen[cid] = [cid, None, msg["created_at"], msg["created_at"]]
+        else:
+            entry[3] = msg["created_at"]
         # Use the first user message as the conversation title
-        if msg["role"] == "user" and seen[cid]["title"] == "New Chat":
-            title = msg["content"][:60]
-            if len(msg["content"]) > 60:
-                title += "..."
-            seen[cid]["title"] = title
-        # Track the latest message time for sorting
-        seen[cid]["updated_at"] = msg["created_at"]
+        if entry[1] is None and msg["role"] == "user":
+            content = msg["content"]
+            entry[1] = content[:60] + "..." if len(content) > 60 else content
 
     # Sort conversations by most recent activity
-    conversations = list(seen.values())
-    conversations.sort(key=lambda c: c["updated_at"], reverse=True)
-    return conversations
+    return [
+        {"id": cid, "title": "New Chat" if title is None else title, "created_at": created_at, "updated_at": updated_at}
+        for cid, title, created_at, updated_at in sorted(seen.values(), key=itemgetter(3), reverse=True)
+    ]
@@ -25,14 +25,40 @@ Authentication:
     The MCP server requires a Supabase JWT in the Authorization header.
     We pass the user's access_token so the MCP server can verify the request.
 
+Tool caching:
+    Tool discovery is a network round trip to the MCP server and the schemas
+    practically never change mid-session, so load_mcp_tools() reuses each
+    token's tool list for 60 s. Keyed per token because the tools carry the
+    user's JWT in their connection config. Failed discoveries are not cached.
+
+Progress:
+    The news tools take a while (they fetch and parse every article) and
+    report MCP progress notifications as they go. _forward_progress()
+    re-emits each one as a LangChain custom event ("tool_progress"), which
+    the agent's astream_events() loop streams to the frontend, so the user
+    sees "3/10" instead of a spinner until the whole result arrives.
+
 Configuration:
     MCP_SERVER_URL in .env:
     - Docker Compose: http://google-trends-mcp:8080/mcp/  (service name)
     - Local dev:      http://localhost:8080/mcp/
 """
 
+import logging
+from cachetools import TTLCache
+from langchain_core.callbacks.manager import adispatch_custom_event
+from langchain_mcp_adapters.callbacks import CallbackContext, Callbacks
 from langchain_mcp_adapters.client import MultiServerMCPClient
-from app.core.config import settings
+from app.core.config import get_settings
+from app.core.http import mcp_httpx_client_factory
+from app.utils.tokens import token_cache_key
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# token_cache_key(access_token) → list of LangChain tools from the MCP server
+_mcp_tools_cache: TTLCache = TTLCache(maxsize=1_000, ttl=60)
 
 
 def get_mcp_client_config(access_token: str = "") -> dict:
@@ -52,6 +78,7 @@ def get_mcp_client_config(access_token: str = "") -> dict:
                 "google-trends": {
                     "url": "http://...:8080/mcp/",
                     "transport": "streamable_http",
+                    "httpx_client_factory": <shared-pool factory>,
                     "headers": {"Authorization": "Bearer <token>"}  # if token provided
                 }
             }
@@ -71,6 +98,8 @@ def get_mcp_client_config(access_token: str = "") -> dict:
         "google-trends": {
             "url": settings.MCP_SERVER_URL,
             "transport": "streamable_http",
+            # Sessions reuse the worker's keep-alive pool (app/core/http.py)
+            "httpx_client_factory": mcp_httpx_client_factory,
         }
     }
     # Add JWT auth header if token is available
@@ -79,3 +108,55 @@ def get_mcp_client_config(access_token: str = "") -> dict:
             "Authorization": f"Bearer {access_token}",
         }
     return config
+
+
+async def _forward_progress(
+    progress: float,
+    total: float | None,
+    message: str | None,
+    context: CallbackContext,
+) -> None:
+    """
+    Re-emit an MCP progress notification as a "tool_progress" custom event.
+
+    Runs inside the tool call, so LangChain finds the tool's run from the
+    context and attaches the event to it.
+    """
+    try:
+        await adispatch_custom_event(
+            "tool_progress",
+            {"tool": context.tool_name, "progress": progress, "total": total},
+        )
+    except RuntimeError:
+        # Tool invoked outside an agent run — nobody is listening
+        pass
+
+
+async def load_mcp_tools(access_token: str = "") -> list | None:
+    """
+    Discover the MCP server's tools for this user, reusing recent results.
+
+    Args:
+        access_token (str): The user's Supabase JWT (see get_mcp_client_config).
+
+    Returns:
+        list | None: LangChain-compatible tools, or None if the MCP server
+            could not be reached (the agent then runs without them).
+    """
+    cache_key = token_cache_key(access_token)
+    mcp_tools = _mcp_tools_cache.get(cache_key)
+    if mcp_tools:
+        return mcp_tools
+    try:
+        mcp_client = MultiServerMCPClient(
+            get_mcp_client_config(access_token=access_token),
+            callbacks=Callbacks(on_progress=_forward_progress),
+        )
+        mcp_tools = await mcp_client.get_tools()
+    except Exception:
+        # MCP server unavailable — log server-side only, don't crash
+        logger.warning("MCP connection failed — continuing without Google Trends tools")
+        return None
+    _mcp_tools_cache[cache_key] = mcp_tools
+    logger.info(f"MCP tools loaded: {[t.name for t in mcp_tools]}")
+    return mcp_tools
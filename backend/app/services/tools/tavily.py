@@ -22,14 +22,21 @@ Configuration:
     web search capability (but still works with other tools / its own knowledge).
 """
 
+from functools import lru_cache
 from langchain_community.tools.tavily_search import TavilySearchResults
-from app.core.config import settings
+from app.core.config import get_settings
 import os
 
+settings = get_settings()
 
+
+@lru_cache(maxsize=1)
 def get_tavily_tool():
     """
-    Create and return a Tavily search tool for the ReAct agent.
+    Create and return a Tavily search tool for the ReAct agent (cached).
+
+    The same instance is returned on every call, which also lets the agent
+    cache (react_agent._agent_cache) recognise the tool set as unchanged.
 
     Returns:
         TavilySearchResults | None:
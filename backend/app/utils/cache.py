@@ -0,0 +1,127 @@
+"""
+cache.py — Small In-Process Caches
+==================================
+
+Caches whose entries expire at a per-entry absolute time rather than after
+one fixed TTL — e.g. a verified JWT can be trusted until its own `exp`
+claim, no longer and no shorter.
+
+Classes:
+    SieveCache → Bounded cache with SIEVE eviction and per-entry expiry
+
+Why SIEVE instead of LRU?
+    SIEVE (Zhang et al., NSDI '24 — also what PostgREST uses for its JWT
+    cache) keeps a FIFO queue plus one "visited" bit per entry. A hit only
+    sets the bit; no reordering. On eviction a "hand" walks from the oldest
+    entry towards the newest, clearing visited bits, and evicts the first
+    unvisited entry it meets. Under churn (many one-off tokens) this keeps
+    the popular entries that LRU would let new arrivals push out, and every
+    operation is O(1).
+
+Concurrency:
+    Every method is synchronous (no `await` inside), so on a single asyncio
+    event loop each call runs atomically and no lock is needed.
+"""
+
+from typing import Any, Hashable, Optional
+import time
+
+
+class _Node:
+    """A cache entry in SieveCache's doubly linked queue."""
+
+    __slots__ = ("key", "value", "expires_at", "visited", "newer", "older")
+
+    def __init__(self, key: Hashable, value: Any, expires_at: float):
+        self.key = key
+        self.value = value
+        self.expires_at = expires_at
+        self.visited = False
+        self.newer: Optional["_Node"] = None
+        self.older: Optional["_Node"] = None
+
+
+class SieveCache:
+    """
+    Bounded cache with SIEVE eviction; each entry carries its own expiry.
+
+    - get() returns None for missing or expired entries (expired ones are
+      evicted on the spot) and marks hits as visited.
+    - set() ignores already-expired entries and, once `maxsize` is reached,
+      evicts one entry using the SIEVE hand before inserting.
+
+    Usage:
+        cache = SieveCache(maxsize=10_000)
+        cache.set(key, value, expires_at=claims["exp"])
+        value = cache.get(key)
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._nodes: dict[Hashable, _Node] = {}
+        self._newest: Optional[_Node] = None
+        self._oldest: Optional[_Node] = None
+        self._hand: Optional[_Node] = None
+
+    def get(self, key: Hashable) -> Any | None:
+        """Return the cached value for `key`, or None if absent or expired."""
+        node = self._nodes.get(key)
+        if node is None:
+            return None
+        if time.time() >= node.expires_at:
+            self._remove(node)
+            return None
+        node.visited = True
+        return node.value
+
+    def set(self, key: Hashable, value: Any, expires_at: float) -> None:
+        """Store `value` under `key` until the Unix time `expires_at`."""
+        if expires_at <= time.time():
+            return
+        node = self._nodes.get(key)
+        if node is not None:
+            node.value = value
+            node.expires_at = expires_at
+            node.visited = True
+            return
+        if len(self._nodes) >= self.maxsize:
+            self._evict()
+        node = _Node(key, value, expires_at)
+        node.older = self._newest
+        if self._newest is not None:
+            self._newest.newer = node
+        self._newest = node
+        if self._oldest is None:
+            self._oldest = node
+        self._nodes[key] = node
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        self._nodes.clear()
+        self._newest = self._oldest = self._hand = None
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def _evict(self) -> None:
+        """Advance the hand past visited entries and evict the first unvisited one."""
+        node = self._hand or self._oldest
+        while node.visited:
+            node.visited = False
+            node = node.newer or self._oldest
+        self._hand = node.newer
+        self._remove(node)
+
+    def _remove(self, node: _Node) -> None:
+        """Unlink `node` from the queue and the index."""
+        if self._hand is node:
+            self._hand = node.newer
+        if node.newer is not None:
+            node.newer.older = node.older
+        else:
+            self._newest = node.older
+        if node.older is not None:
+            node.older.newer = node.newer
+        else:
+            self._oldest = node.newer
+        del self._nodes[node.key]
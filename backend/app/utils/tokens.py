@@ -0,0 +1,30 @@
+"""
+tokens.py — Access Token Helpers
+================================
+
+Small helpers for working with user JWTs outside of the auth flow itself.
+
+Functions:
+    token_cache_key() → Derive a short, non-reversible cache key from a JWT
+
+Why hash instead of using the raw token?
+    In-process caches are keyed per token. Storing the raw JWT as a dict key
+    would keep a usable credential in memory (and in any heap dump / debug
+    log of the cache). A truncated SHA-256 digest is just as unique for our
+    purposes but useless to anyone who reads it.
+"""
+
+import hashlib
+
+
+def token_cache_key(token: str) -> str:
+    """
+    Return a 32-character hex fingerprint of a JWT for use as a cache key.
+
+    Args:
+        token (str): The raw Bearer token.
+
+    Returns:
+        str: First 128 bits of sha256(token), hex-encoded.
+    """
+    return hashlib.sha256(token.encode()).hexdigest()[:32]
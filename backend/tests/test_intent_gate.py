@@ -0,0 +1,42 @@
+"""
+test_intent_gate.py — needs_trends_tools() phrase table
+=======================================================
+
+Run from backend/:  python -m pytest tests
+"""
+
+import pytest
+
+from app.services.agent.react_agent import needs_trends_tools
+
+
+@pytest.mark.parametrize(
+    ("message", "expected"),
+    [
+        # News / trends turns — must load the MCP tools
+        ("What is the latest news about Tesla?", True),
+        ("Any news from Kenya today?", True),
+        ("Show me technology news", True),
+        ("What's trending on Google right now?", True),
+        ("Top stories this morning", True),
+        ("Give me today's headlines", True),
+        ("Any breaking updates on the election?", True),
+        ("What went viral this week?", True),
+        ("Check Google News for AI", True),
+        # Clearly unrelated turns — MCP is skipped
+        ("hi", False),
+        ("Explain how a hash map works", False),
+        ("Write a haiku about autumn", False),
+        ("What's 17 times 23?", False),
+    ],
+)
+def test_needs_trends_tools(message, expected):
+    assert needs_trends_tools(message) is expected
+
+
+def test_follow_up_in_news_conversation_keeps_tools():
+    history = [
+        {"role": "user", "content": "Show me technology news"},
+        {"role": "assistant", "content": "1. ... 2. ..."},
+    ]
+    assert needs_trends_tools("Tell me more about the second one", history)
@@ -36,6 +36,7 @@ export interface StreamCallbacks {
   onToken: (content: string) => void;
   onToolStart: (tool: string) => void;
   onToolEnd: (tool: string) => void;
+  onToolProgress: (tool: string, progress: number, total: number | null) => void;
   onToolStatus: (message: string) => void;
   onDone: (conversationId: string) => void;
   onError: (error: string) => void;
@@ -111,6 +112,9 @@ export function streamChat(
                 case "tool_end":
                   callbacks.onToolEnd(parsed.tool);
                   break;
+                case "tool_progress":
+                  callbacks.onToolProgress(parsed.tool, parsed.progress, parsed.total);
+                  break;
                 case "tool_status":
                   callbacks.onToolStatus(parsed.message);
                   break;
@@ -170,6 +170,11 @@ export default function ChatPage() {
       onToolEnd: () => {
         setToolActivity("");
       },
+      onToolProgress: (tool, progress, total) => {
+        setToolActivity(
+          `${getToolLabel(tool)} (${progress}${total != null ? `/${total}` : ""})`
+        );
+      },
       onToolStatus: (message) => {
         setToolActivity(message);
         setTimeout(() => setToolActivity(""), 4000);
@@ -16,5 +16,6 @@ export type SSEEvent =
   | { type: "token"; content: string }
   | { type: "tool_start"; tool: string }
   | { type: "tool_end"; tool: string }
+  | { type: "tool_progress"; tool: string; progress: number; total: number | null }
   | { type: "tool_status"; message: string }
   | { type: "done"; conversation_id: string };